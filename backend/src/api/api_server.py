@@ -1,18 +1,28 @@
 import time
-import csv
+import cProfile
+import contextvars
+import functools
+import inspect
+import threading
 import datetime
 import asyncio
-import yaml
-from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect
+import json
+import numpy as np
+from typing import Callable, Literal
+from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.routing import APIRoute
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
-from src.core.power_supply import PowerSupply
-from src.core.power_analyzer import PowerAnalyzer
-from src.core.arduino import Arduino
-from src.utils.config import APIConfig, PowerSupplyConfig, PowerAnalyzerConfig, ArduinoConfig
-from src.utils.utils import regression
+from src.api.broadcaster import Broadcaster
+from src.api.snapshot import Snapshot
+from src.core.acquisition import Acquisition
+from src.core.daemon import AcquisitionClient
+from src.core.sessions import SessionStore
+from src.utils.config import APIConfig, DaemonConfig
+from src.utils.metrics import METRICS, HTTP_REQUESTS, API_METRICS
 
 
 class VoltageRequest(BaseModel):
@@ -27,202 +37,415 @@ class CalibrationRequest(BaseModel):
     saveFile: bool
 
 
+class RecorderRequest(BaseModel):
+    name: str | None = None
+
+
+class PowerSupplyCommand(BaseModel):
+    id: str
+    voltage: float | None = None
+    current: float | None = None
+    on: bool | None = None
+
+
+class BatchRequest(BaseModel):
+    commands: list[PowerSupplyCommand]
+
+
+class SweepStep(BaseModel):
+    setpoints: list[PowerSupplyCommand]
+    ramp: float = 0.0
+    dwell: float = 1.0
+
+
+class SettleRequest(BaseModel):
+    channels: list[str]
+    field: str = 'current'
+    tolerance: float = 0.05
+    window: float = 0.5
+    timeout: float = 10.0
+
+
+class SweepRequest(BaseModel):
+    steps: list[SweepStep]
+    repeat: int = 1
+    ramp_rate: float = 10.0
+    settle: SettleRequest | None = None
+
+
+class TriggerRequest(BaseModel):
+    type: Literal['threshold', 'edge', 'command']
+    channel: str | None = None
+    field: str = 'current'
+    level: float | None = None
+    direction: Literal['above', 'below', 'rising', 'falling', 'either'] | None = None
+    psu: str | None = None
+    command: Literal['on', 'off', 'voltage', 'current', 'any'] = 'on'
+
+
+class CaptureRequest(BaseModel):
+    trigger: TriggerRequest
+    pre: float = 0.5
+    post: float = 2.0
+    rate: float | None = None
+    timeout: float | None = None
+
+
+PROFILER = contextvars.ContextVar('profiler', default=None)
+
+
+def _profiled(endpoint: Callable) -> Callable:
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def profiled(*args, **kwargs):
+            profiler = PROFILER.get()
+            if profiler is None:
+                return await endpoint(*args, **kwargs)
+            profiler.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profiler.disable()
+    else:
+        @functools.wraps(endpoint)
+        def profiled(*args, **kwargs):
+            profiler = PROFILER.get()
+            if profiler is None:
+                return endpoint(*args, **kwargs)
+            profiler.enable()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                profiler.disable()
+    return profiled
+
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+
+@contextmanager
+def _errors():
+    try:
+        yield
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (RuntimeError, FileExistsError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
 class APIServer:
-    def __init__(self):
-        config_path = Path(__file__).parent.parent / 'config/config.yaml'
+    _max_long_poll = 30.0
+
+    def __init__(self, config_path: Path | None = None):
+        config_path = config_path or Path(__file__).parent.parent / 'config/config.yaml'
         api_config = APIConfig.from_yaml(config_path)
-        psu_config = PowerSupplyConfig.from_yaml(config_path)
-        pwa_config = PowerAnalyzerConfig.from_yaml(config_path)
-        arduino_config = ArduinoConfig.from_yaml(config_path)
-        self._calibration_path = Path(__file__).parent.parent / api_config.calibration_path
-        with open(self._calibration_path) as stream:
-            calibration = yaml.safe_load(stream)
-        self._psu_upper = PowerSupply(psu_config.ip[0], psu_config.port, psu_config.buffer_size, psu_config.timeout,
-                                      psu_config.max_voltage,
-                                      psu_config.max_current, psu_config.max_power)
-        self._psu_lower = PowerSupply(psu_config.ip[1], psu_config.port, psu_config.buffer_size, psu_config.timeout,
-                                      psu_config.max_voltage,
-                                      psu_config.max_current, psu_config.max_power)
-        self._pwa = PowerAnalyzer(pwa_config.ip, pwa_config.port, pwa_config.buffer_size, pwa_config.timeout,
-                                  pwa_config.sampling_frequency)
-        self._arduino = Arduino(arduino_config.ip, arduino_config.port, arduino_config.buffer_size,
-                                arduino_config.timeout, arduino_config.sampling_frequency, calibration)
-        self._router = APIRouter()
-        self._sample_frequency = api_config.sample_frequency
-        self._calibration_current_start = api_config.calibration_current_start
-        self._calibration_current_step = api_config.calibration_current_step
-        self._calibration_current_max = api_config.calibration_current_max
-        self._calibration_samples = api_config.samples
-        self._measurement_path = api_config.measurement_path if api_config.measurement_path is not None else Path(
-            __file__).parent.parent / 'measurements'
-        self._latest_snapshot = {'time': 0.0, 'pwa': {}, 'arduino': {}}
-        self._clients = set()
+        daemon_config = DaemonConfig.from_yaml(config_path)
+        self._remote = daemon_config.enabled
+        if self._remote:
+            self._acquisition = AcquisitionClient(daemon_config)
+        else:
+            self._acquisition = Acquisition(config_path)
+        self._router = APIRouter(route_class=ProfiledRoute)
+        self._measurement_path = self._acquisition.measurement_path()
+        self._latest_snapshot = self._acquisition.snapshot()
+        self._snapshot_ready = asyncio.Condition()
+        self._profiling = api_config.profiling
+        self._profiler_lock = threading.Lock()
+        self._broadcaster = Broadcaster(self._acquisition.layout())
+        self._sessions = SessionStore(self._measurement_path)
 
         @asynccontextmanager
         async def lifespan(app: FastAPI):
-            asyncio.create_task(self._task_snapshot())
+            loop = asyncio.get_running_loop()
+            self._acquisition.start(lambda snapshot: asyncio.run_coroutine_threadsafe(self._publish(snapshot), loop))
             yield
-            self._psu_upper.shutdown()
-            self._psu_lower.shutdown()
-            self._pwa.shutdown()
-            self._arduino.shutdown()
+            self._acquisition.shutdown()
 
         self._app = FastAPI(title='Backend API', lifespan=lifespan)
         self._app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_credentials=True, allow_methods=['*'],
                                  allow_headers=['*'], expose_headers=['*'])
+        self._app.middleware('http')(self._measure_request)
         self._register_routes()
         self._app.include_router(self._router)
 
     def _register_routes(self):
 
-        @self._router.post('/api/psu/upper/state')
-        def upper_get_psu_state():
-            return {'is_on': self._psu_upper.on}
-
-        @self._router.post('/api/psu/upper/toggle')
-        def upper_toggle_psu():
-            new_state = self._psu_upper.on_off()
-            return {"is_on": new_state}
-
-        @self._router.get('/api/psu/upper/get/voltage')
-        def upper_get_voltage():
-            return {'voltage': self._psu_upper.voltage}
-
-        @self._router.post('/api/psu/upper/set/voltage', response_model=VoltageRequest)
-        def upper_set_voltage(voltage: VoltageRequest):
-            self._psu_upper.voltage = voltage.setpoint
-            new_voltage = self._psu_upper.voltage
-            return {'setpoint': new_voltage}
-
-        @self._router.get('/api/psu/upper/get/current')
-        def upper_get_current():
-            return {'current': self._psu_upper.current}
-
-        @self._router.post('/api/psu/upper/set/current', response_model=CurrentRequest)
-        def upper_set_current(current: CurrentRequest):
-            self._psu_upper.current = current.setpoint
-            new_current = self._psu_upper.current
-            return {'setpoint': new_current}
-
-        @self._router.post('/api/psu/lower/state')
-        def lower_get_psu_state():
-            return {'is_on': self._psu_lower.on}
-
-        @self._router.post('/api/psu/lower/toggle')
-        def lower_toggle_psu():
-            new_state = self._psu_lower.on_off()
-            return {"is_on": new_state}
-
-        @self._router.get('/api/psu/lower/get/voltage')
-        def lower_get_voltage():
-            return {'voltage': self._psu_lower.voltage}
-
-        @self._router.post('/api/psu/lower/set/voltage', response_model=VoltageRequest)
-        def lower_set_voltage(voltage: VoltageRequest):
-            self._psu_lower.voltage = voltage.setpoint
-            new_voltage = self._psu_lower.voltage
-            return {'setpoint': new_voltage}
-
-        @self._router.get('/api/psu/lower/get/current')
-        def lower_get_current():
-            return {'current': self._psu_lower.current}
-
-        @self._router.post('/api/psu/lower/set/current', response_model=CurrentRequest)
-        def lower_set_current(current: CurrentRequest):
-            self._psu_lower.current = current.setpoint
-            new_current = self._psu_lower.current
-            return {'setpoint': new_current}
+        @self._router.get('/api/psu')
+        async def list_power_supplies():
+            with _errors():
+                return await self._acquisition.power_supplies()
+
+        @self._router.post('/api/psu/batch')
+        async def batch_power_supplies(request: BatchRequest):
+            with _errors():
+                return await self._acquisition.apply([command.model_dump() for command in request.commands])
+
+        @self._router.post('/api/psu/{psu_id}/state')
+        async def get_psu_state(psu_id: str):
+            with _errors():
+                return {'is_on': (await self._acquisition.power_supply(psu_id))['is_on']}
+
+        @self._router.post('/api/psu/{psu_id}/toggle')
+        async def toggle_psu(psu_id: str):
+            with _errors():
+                return {"is_on": await self._acquisition.toggle(psu_id)}
+
+        @self._router.get('/api/psu/{psu_id}/get/voltage')
+        async def get_voltage(psu_id: str):
+            with _errors():
+                return {'voltage': (await self._acquisition.power_supply(psu_id))['voltage']}
+
+        @self._router.post('/api/psu/{psu_id}/set/voltage', response_model=VoltageRequest)
+        async def set_voltage(psu_id: str, voltage: VoltageRequest):
+            with _errors():
+                state, = await self._acquisition.apply([{'id': psu_id, 'voltage': voltage.setpoint}])
+            return {'setpoint': state['voltage']}
+
+        @self._router.get('/api/psu/{psu_id}/get/current')
+        async def get_current(psu_id: str):
+            with _errors():
+                return {'current': (await self._acquisition.power_supply(psu_id))['current']}
+
+        @self._router.post('/api/psu/{psu_id}/set/current', response_model=CurrentRequest)
+        async def set_current(psu_id: str, current: CurrentRequest):
+            with _errors():
+                state, = await self._acquisition.apply([{'id': psu_id, 'current': current.setpoint}])
+            return {'setpoint': state['current']}
+
+        @self._router.get('/api/health')
+        def get_health():
+            with _errors():
+                health = self._acquisition.health()
+            connected = all(instrument['connected'] for kind in health.values() for instrument in kind.values())
+            return {'status': 'ok' if connected else 'degraded', 'instruments': health}
+
+        @self._router.get('/api/metrics')
+        def get_metrics():
+            if self._remote:
+                with _errors():
+                    content = self._acquisition.metrics(API_METRICS) + METRICS.render(include=API_METRICS)
+            else:
+                content = self._acquisition.metrics()
+            return Response(content=content, media_type='text/plain; version=0.0.4')
+
+        @self._router.get('/api/stats')
+        def get_stats(instrument: str | None = None):
+            with _errors():
+                return self._acquisition.stats(instrument)
 
         @self._router.get('/api/data')
-        def get_snapshot():
-            return self._latest_snapshot
+        async def get_snapshot(request: Request, after: int | None = None, timeout: float = 0.0):
+            snapshot = self._latest_snapshot
+            if after is not None and snapshot.sequence == after and timeout > 0:
+                try:
+                    async with self._snapshot_ready:
+                        await asyncio.wait_for(
+                            self._snapshot_ready.wait_for(lambda: self._latest_snapshot.sequence != after),
+                            min(timeout, self._max_long_poll))
+                except asyncio.TimeoutError:
+                    pass
+                snapshot = self._latest_snapshot
+            etag = f'"{self._acquisition.instance()}-{snapshot.sequence}"'
+            headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+            if_none_match = [tag.strip() for tag in request.headers.get('if-none-match', '').split(',')]
+            if etag in if_none_match or snapshot.sequence == after:
+                return Response(status_code=304, headers=headers)
+            return Response(content=snapshot.json, media_type='application/json', headers=headers)
+
+        @self._router.get('/api/history')
+        def get_history(channel: str, since: float | None = None, max_points: int = 1000,
+                        method: Literal['lttb', 'minmax'] = 'lttb', field: str | None = None,
+                        format: Literal['json', 'binary'] = 'json'):
+            with _errors():
+                times, values, fields = self._acquisition.history(channel, since, max_points, method, field)
+            if format == 'binary':
+                packed = np.column_stack((times, values)).astype('<f8')
+                return Response(content=packed.tobytes(), media_type='application/octet-stream',
+                                headers={'X-Fields': ','.join(('time',) + fields)})
+            data = {'channel': channel, 'time': times.tolist()}
+            for i, name in enumerate(fields):
+                data[name] = [None if np.isnan(v) else v for v in values[:, i].tolist()]
+            return data
+
+        @self._router.get('/api/recorder')
+        def get_recorder():
+            with _errors():
+                return self._acquisition.recorder()
+
+        @self._router.post('/api/recorder/start')
+        def start_recorder(request: RecorderRequest):
+            with _errors():
+                return self._acquisition.start_recorder(request.name)
+
+        @self._router.post('/api/recorder/stop')
+        def stop_recorder():
+            with _errors():
+                return self._acquisition.stop_recorder()
+
+        @self._router.get('/api/sessions')
+        def list_sessions():
+            return self._sessions.list_sessions()
+
+        @self._router.get('/api/sessions/{name}')
+        def get_session(name: str):
+            try:
+                return self._sessions.metadata(name)
+            except KeyError:
+                raise HTTPException(status_code=404, detail=f'Unknown session: {name}')
+
+        @self._router.get('/api/sessions/{name}/export')
+        def export_session(name: str, stream: str, columns: str | None = None, start: float | None = None,
+                           end: float | None = None, decimate: int = 1, format: Literal['csv', 'binary'] = 'csv'):
+            selected = columns.split(',') if columns else None
+            try:
+                dtype = self._sessions.dtype(name, stream, selected)
+            except KeyError as e:
+                raise HTTPException(status_code=404, detail=f'Unknown session, stream or column: {e}')
+            if decimate < 1:
+                raise HTTPException(status_code=400, detail='decimate must be at least 1')
+            filename = f'{name}_{stream}.{"csv" if format == "csv" else "bin"}'
+            headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+            if format == 'csv':
+                return StreamingResponse(self._sessions.export_csv(name, stream, selected, start, end, decimate),
+                                         media_type='text/csv', headers=headers)
+            headers['X-Dtype'] = json.dumps([[field, dtype[field].str] for field in dtype.names])
+            return StreamingResponse(self._sessions.export_binary(name, stream, selected, start, end, decimate),
+                                     media_type='application/octet-stream', headers=headers)
 
         @self._router.post('/api/calibrate')
         def get_calibration(save_file: CalibrationRequest):
-            self._calibrate_sensor(save_file.saveFile)
-            return {'done': True}
+            with _errors():
+                return self._acquisition.calibrate(save_file.saveFile)
+
+        @self._router.get('/api/calibrate/{job_id}')
+        def get_calibration_status(job_id: str):
+            with _errors():
+                status, _, _ = self._acquisition.job(job_id)
+            return status
+
+        @self._router.post('/api/calibrate/{job_id}/cancel')
+        def cancel_calibration(job_id: str):
+            with _errors():
+                return self._acquisition.cancel(job_id)
+
+        @self._router.websocket('/websocket/calibrate/{job_id}')
+        async def websocket_calibration(websocket: WebSocket, job_id: str):
+            await self._stream_job(websocket, job_id)
+
+        @self._router.post('/api/sweep')
+        def start_sweep(request: SweepRequest):
+            with _errors():
+                return self._acquisition.sweep([step.model_dump() for step in request.steps], request.repeat,
+                                               request.ramp_rate,
+                                               request.settle.model_dump() if request.settle is not None else None)
+
+        @self._router.get('/api/sweep/{job_id}')
+        def get_sweep_status(job_id: str):
+            with _errors():
+                status, _, results = self._acquisition.job(job_id)
+            return {**status, 'results': results}
+
+        @self._router.post('/api/sweep/{job_id}/cancel')
+        def cancel_sweep(job_id: str):
+            with _errors():
+                return self._acquisition.cancel(job_id)
+
+        @self._router.websocket('/websocket/sweep/{job_id}')
+        async def websocket_sweep(websocket: WebSocket, job_id: str):
+            await self._stream_job(websocket, job_id)
+
+        @self._router.post('/api/capture')
+        def start_capture(request: CaptureRequest):
+            with _errors():
+                return self._acquisition.capture(request.trigger.model_dump(), request.pre, request.post,
+                                                 request.rate, request.timeout)
+
+        @self._router.get('/api/capture/{job_id}')
+        def get_capture(job_id: str):
+            with _errors():
+                status, _, _ = self._acquisition.job(job_id, 0, False)
+            return status
+
+        @self._router.get('/api/capture/{job_id}/result')
+        def get_capture_result(job_id: str):
+            with _errors():
+                return self._acquisition.result(job_id)
+
+        @self._router.post('/api/capture/{job_id}/cancel')
+        def cancel_capture(job_id: str):
+            with _errors():
+                return self._acquisition.cancel(job_id, False)
+
+        @self._router.websocket('/websocket/capture/{job_id}')
+        async def websocket_capture(websocket: WebSocket, job_id: str):
+            await self._stream_job(websocket, job_id)
 
         @self._router.websocket('/websocket/snapshot')
-        async def websocket_snapshot(websocket: WebSocket):
-            await websocket.accept()
-            try:
-                await websocket.receive_text()
-            except WebSocketDisconnect:
-                pass
-            finally:
-                self._clients.discard(websocket)
-
-    async def _task_snapshot(self) -> None:
-        while True:
-            await asyncio.sleep(1 / self._sample_frequency)
-            self._latest_snapshot['time'] = time.time()
-            self._latest_snapshot['arduino'] = self._arduino.read
-            self._latest_snapshot['pwa'] = self._pwa.read
-            dead = []
-            for websocket in list(self._clients):
-                try:
-                    await websocket.send_json(
-                        {'time': self._latest_snapshot['time'],
-                         'pwa': self._latest_snapshot['pwa'],
-                         'arduino': self._latest_snapshot['arduino']})
-                except Exception:
-                    dead.append(websocket)
-            for websocket in dead:
-                self._clients.discard(websocket)
-
-    def _calibrate_sensor(self, save_file: bool) -> None:
-        arduino_measurements = []
-        pwa_measurements = []
-        currents = [i for i in range(self._calibration_current_start, self._calibration_current_max + 10,
-                                     self._calibration_current_step)]
-        self._psu_upper.voltage = 1
-        self._psu_upper.current = 0
-        self._psu_upper.on_off()
-        for current in currents:
-            arduino_data = []
-            pwa_data = []
-            self._psu_upper.current = current
-            time.sleep(0.5)
-            while self._pwa.read['channel1']['current'] > 1000:
-                time.sleep(0.5)
+        async def websocket_snapshot(websocket: WebSocket, rate: float | None = None,
+                                     format: Literal['json', 'binary'] = 'json'):
+            await self._broadcaster.serve(websocket, rate, format)
+
+    async def _measure_request(self, request: Request, call_next):
+        profiler = None
+        if self._profiling and 'x-profile' in request.headers and self._profiler_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            token = PROFILER.set(profiler)
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            if profiler is not None:
+                PROFILER.reset(token)
+                self._profiler_lock.release()
+        elapsed = time.perf_counter() - started
+        route = getattr(request.scope.get('route'), 'path', 'unmatched')
+        HTTP_REQUESTS.labels(request.method, route).observe(elapsed)
+        response.headers['Server-Timing'] = f'app;dur={elapsed * 1000:.3f}'
+        if profiler is not None:
+            path = self._measurement_path / 'profiles' / (
+                f'{datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S-%f")}_{request.method}'
+                f'{route.replace("/", "_")}.prof')
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+            response.headers['X-Profile-File'] = str(path)
+        return response
+
+    async def _publish(self, snapshot: Snapshot) -> None:
+        self._latest_snapshot = snapshot
+        self._broadcaster.publish(snapshot)
+        async with self._snapshot_ready:
+            self._snapshot_ready.notify_all()
+
+    async def _stream_job(self, websocket: WebSocket, job_id: str) -> None:
+        await websocket.accept()
+        try:
+            await asyncio.to_thread(self._acquisition.job, job_id)
+        except KeyError:
+            await websocket.close(code=4404)
+            return
+        version = -1
+        sent = 0
+        try:
             while True:
-                if len(arduino_data) >= self._calibration_samples:
-                    break
-                arduino_read = self._arduino.read['channels']['channel1']['voltage']
-                while True:
-                    pwa_read = self._pwa.read['channel1']['current']
-                    if pwa_read < 1000:
+                status, current, events = await asyncio.to_thread(self._acquisition.job, job_id, sent)
+                if current != version:
+                    version = current
+                    if events:
+                        status['events'] = events
+                        sent += len(events)
+                    await websocket.send_json(status)
+                    if status['state'] != 'running':
                         break
-                arduino_data.append(arduino_read)
-                pwa_data.append(pwa_read)
-                time.sleep(0.01)
-            pwa_measurements.append(pwa_data)
-            arduino_measurements.append(arduino_data)
-        self._psu_upper.voltage = 0
-        self._psu_upper.current = 0
-        self._psu_upper.on_off()
-        k, m = regression(pwa_measurements, arduino_measurements)
-        data = dict(k=float(k), m=float(m))
-        with open(self._calibration_path, 'w', encoding='utf-8') as stream:
-            yaml.safe_dump(data, stream, sort_keys=False)
-        self._arduino.k = k
-        self._arduino.m = m
-        print('Samples per current:')
-        for arduino_measurement in arduino_measurements:
-            print(len(arduino_measurement))
-        if save_file:
-            self._write_to_file(currents, pwa_measurements, arduino_measurements)
-
-    def _write_to_file(self, currents: list, pwa_measurements: list, arduino_measurements: list):
-        name = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-        path = self._measurement_path / f'measurements_{name}.csv'
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open('a', newline='', encoding='utf-8') as stream:
-            writer = csv.writer(stream)
-            writer.writerow(['Currents:', 'Power analyzer current:', 'Arduino voltage:'])
-            for i, current in enumerate(currents):
-                for pwa_measurement, arduino_measurement in zip(pwa_measurements[i], arduino_measurements[i]):
-                    writer.writerow([current, pwa_measurement, arduino_measurement])
+                await asyncio.sleep(0.2)
+            await websocket.close()
+        except WebSocketDisconnect:
+            pass
 
     @property
     def app(self):
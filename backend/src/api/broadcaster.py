@@ -0,0 +1,117 @@
+import asyncio
+import json
+import struct
+import time
+from fastapi import WebSocket, WebSocketDisconnect
+from src.api.snapshot import Snapshot
+from src.utils.metrics import WEBSOCKET_SEND, WEBSOCKET_DROPPED
+
+
+class BroadcastClient:
+    def __init__(self, websocket: WebSocket, rate: float | None, encoding: str, queue_size: int):
+        self._websocket = websocket
+        self._encoding = encoding
+        self._interval = 0.0
+        self._next_send = 0.0
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._dropped = 0
+        self._id = f'{websocket.client.host}:{websocket.client.port}' if websocket.client else str(id(websocket))
+        self._send_time = WEBSOCKET_SEND.labels(self._id)
+        self._drop_count = WEBSOCKET_DROPPED.labels(self._id)
+        self.rate = rate
+
+    def due(self, now: float) -> bool:
+        return now >= self._next_send
+
+    def offer(self, frame: str | bytes, now: float) -> None:
+        self._next_send = max(self._next_send + self._interval, now)
+        if self._queue.full():
+            self._queue.get_nowait()
+            self._dropped += 1
+            self._drop_count.inc()
+        self._queue.put_nowait(frame)
+
+    async def run(self) -> None:
+        while True:
+            frame = await self._queue.get()
+            started = time.perf_counter()
+            if isinstance(frame, bytes):
+                await self._websocket.send_bytes(frame)
+            else:
+                await self._websocket.send_text(frame)
+            self._send_time.observe(time.perf_counter() - started)
+
+    def close(self) -> None:
+        WEBSOCKET_SEND.remove(self._id)
+        WEBSOCKET_DROPPED.remove(self._id)
+
+    @property
+    def encoding(self) -> str:
+        return self._encoding
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    @property
+    def rate(self) -> float | None:
+        return 1 / self._interval if self._interval else None
+
+    @rate.setter
+    def rate(self, rate: float | None) -> None:
+        self._interval = 1 / rate if rate else 0.0
+
+
+class Broadcaster:
+    def __init__(self, layout: list[tuple[str, ...]], queue_size: int = 4):
+        self._layout = layout
+        self._packer = struct.Struct(f'<{len(layout)}d')
+        self._queue_size = queue_size
+        self._clients = set()
+
+    def _pack(self, snapshot: dict) -> bytes:
+        values = []
+        for path in self._layout:
+            value = snapshot
+            for key in path:
+                value = value.get(key, {}) if isinstance(value, dict) else {}
+            values.append(value if isinstance(value, (int, float)) else float('nan'))
+        return self._packer.pack(*values)
+
+    def publish(self, snapshot: Snapshot) -> None:
+        now = time.monotonic()
+        binary = None
+        for client in self._clients:
+            if not client.due(now):
+                continue
+            if client.encoding == 'binary':
+                if binary is None:
+                    binary = self._pack(snapshot.data)
+                client.offer(binary, now)
+            else:
+                client.offer(snapshot.text, now)
+
+    async def serve(self, websocket: WebSocket, rate: float | None, encoding: str) -> None:
+        await websocket.accept()
+        client = BroadcastClient(websocket, rate, encoding, self._queue_size)
+        if encoding == 'binary':
+            await websocket.send_json({'layout': ['.'.join(path) for path in self._layout]})
+        self._clients.add(client)
+        sender = asyncio.create_task(client.run())
+        try:
+            while True:
+                message = await websocket.receive_text()
+                try:
+                    client.rate = json.loads(message)['rate']
+                except (ValueError, KeyError, TypeError):
+                    continue
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._clients.discard(client)
+            sender.cancel()
+            client.close()
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
@@ -0,0 +1,58 @@
+import json
+from src.core.sample import Sample
+
+
+def _acquired(sample: Sample | None) -> dict[str, float | int]:
+    return {'time': sample.time, 'sequence': sample.sequence} if sample is not None else {'time': 0.0, 'sequence': 0}
+
+
+class Snapshot:
+    __slots__ = ('_sequence', '_data', '_text', '_json')
+
+    def __init__(self, sequence: int, timestamp: float, power_analyzers: dict[str, Sample | None],
+                 arduinos: dict[str, tuple[Sample | None, dict[str, dict[str, float | str]]]], stats: dict[str, dict]):
+        self._sequence = sequence
+        self._data = {'time': timestamp, 'sequence': sequence}
+        acquired = {}
+        for name, sample in power_analyzers.items():
+            self._data[name] = sample.to_dict() if sample is not None else {}
+            acquired[name] = _acquired(sample)
+        for name, (sample, calibration) in arduinos.items():
+            self._data[name] = {'channels': sample.to_dict() if sample is not None else {},
+                                'calibration': calibration}
+            acquired[name] = _acquired(sample)
+        self._data['acquired'] = acquired
+        self._data['stats'] = stats
+        self._text = None
+        self._json = None
+
+    @classmethod
+    def from_json(cls, sequence: int, payload: bytes) -> 'Snapshot':
+        snapshot = cls.__new__(cls)
+        snapshot._sequence = sequence
+        snapshot._data = None
+        snapshot._text = None
+        snapshot._json = payload
+        return snapshot
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            self._data = json.loads(self._json)
+        return self._data
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self._json.decode('UTF-8') if self._json is not None else json.dumps(self._data)
+        return self._text
+
+    @property
+    def json(self) -> bytes:
+        if self._json is None:
+            self._json = self.text.encode('UTF-8')
+        return self._json
@@ -0,0 +1,467 @@
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import yaml
+import numpy as np
+from pathlib import Path
+from typing import Callable
+from fastapi import WebSocketDisconnect
+from src.api.broadcaster import Broadcaster
+from src.api.snapshot import Snapshot
+from src.core.arduino import Arduino
+from src.core.power_analyzer import PowerAnalyzer
+from src.core.sample import Sample
+from src.core.statistics import RollingStats
+from src.utils.config import APIConfig, ArduinoConfig, PowerAnalyzerConfig, StatsConfig
+from src.utils.utils import regression
+
+CONFIG_PATH = Path(__file__).parent.parent / 'config/config.yaml'
+BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+BACKEND_PATH = Path(__file__).parent.parent.parent
+
+
+class StreamTransport:
+    def __init__(self, chunk: bytes):
+        self._chunk = chunk
+        self._credit = 0
+        self._waiting = False
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def sendall(self, data: bytes) -> None:
+        pass
+
+    def recv_into(self, buffer: bytearray | memoryview) -> int:
+        with self._condition:
+            self._waiting = True
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: self._credit != 0 or self._closed)
+            self._waiting = False
+            if self._closed:
+                return 0
+            if self._credit is not None:
+                self._credit -= 1
+        buffer[:len(self._chunk)] = self._chunk
+        return len(self._chunk)
+
+    def run(self, number: int) -> float:
+        with self._condition:
+            self._condition.wait_for(lambda: self._waiting)
+            started = time.perf_counter()
+            self._credit = number
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: self._credit == 0 and self._waiting)
+            return time.perf_counter() - started
+
+    def release(self) -> None:
+        with self._condition:
+            self._credit = None
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class ReplyTransport:
+    def __init__(self, reply: Callable[[str], bytes]):
+        self._reply = reply
+        self._pending = bytearray()
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def sendall(self, data: bytes) -> None:
+        with self._condition:
+            for command in data.decode('UTF-8').splitlines():
+                self._pending += self._reply(command)
+            self._condition.notify_all()
+
+    def recv_into(self, buffer: bytearray | memoryview) -> int:
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending or self._closed)
+            size = min(len(buffer), len(self._pending))
+            buffer[:size] = self._pending[:size]
+            del self._pending[:size]
+            return size
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class FakeWebSocket:
+    client = None
+
+    def __init__(self, delivered: Callable[[], None]):
+        self._delivered = delivered
+        self._closed = asyncio.Event()
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_json(self, data: dict) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        self._delivered()
+
+    async def send_bytes(self, data: bytes) -> None:
+        self._delivered()
+
+    async def receive_text(self) -> str:
+        await self._closed.wait()
+        raise WebSocketDisconnect()
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+def _loop(func: Callable[[], object]) -> Callable[[int], float]:
+    def run(number: int) -> float:
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            return time.perf_counter() - started
+        finally:
+            if enabled:
+                gc.enable()
+
+    return run
+
+
+def _measure(run: Callable[[int], float], repeat: int, min_time: float) -> dict[str, float | int]:
+    number = 1
+    while True:
+        elapsed = run(number)
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(int(min_time / elapsed * 1.2) + 1, 10 * number))
+    timings = [elapsed / number] + [run(number) / number for _ in range(repeat - 1)]
+    return {'median': statistics.median(timings), 'min': min(timings), 'max': max(timings),
+            'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0, 'number': number, 'repeat': repeat}
+
+
+def _calibration() -> dict:
+    api_config = APIConfig.from_yaml(CONFIG_PATH)
+    with open(CONFIG_PATH.parent.parent / api_config.calibration_path) as stream:
+        return yaml.safe_load(stream)
+
+
+def _arduino_lines(count: int, rng: np.random.Generator) -> bytes:
+    values = rng.integers(0, 1024, size=(count, 2))
+    return ''.join(f'{a},{b}\n' for a, b in values.tolist()).encode('UTF-8')
+
+
+def _sample(channels: int, fields: tuple[str, ...], rng: np.random.Generator, sequence: int = 1) -> Sample:
+    return Sample(time.time(), sequence, tuple(f'channel{i}' for i in range(1, channels + 1)), fields,
+                  tuple(rng.normal(size=channels * len(fields)).tolist()))
+
+
+class Benchmarks:
+    def __init__(self, repeat: int, min_time: float):
+        self._repeat = repeat
+        self._min_time = min_time
+        self._rng = np.random.default_rng(0)
+        self._arduino_config = ArduinoConfig.from_yaml(CONFIG_PATH)
+        self._pwa_config = PowerAnalyzerConfig.from_yaml(CONFIG_PATH)
+        self._stats_config = StatsConfig.from_yaml(CONFIG_PATH)
+        self._api_config = APIConfig.from_yaml(CONFIG_PATH)
+
+    def _arduino(self, lines: int, filters: list[dict]) -> Callable[[], dict]:
+        def benchmark() -> dict:
+            chunk = _arduino_lines(lines, self._rng)
+            transport = StreamTransport(chunk)
+            arduino = Arduino('127.0.0.1', 0, len(chunk), 1.0, self._arduino_config.sampling_frequency,
+                              _calibration(), self._arduino_config.history_size, filters, lambda: transport)
+            try:
+                return {**_measure(transport.run, self._repeat, self._min_time), 'items': lines}
+            finally:
+                transport.release()
+                arduino.shutdown()
+
+        return benchmark
+
+    def _pwa(self, channels: int, mode: str) -> PowerAnalyzer:
+        items = len(self._pwa_config.quantities)
+        values = self._rng.uniform(0, 500, size=(items, channels))
+        measure = (';'.join(','.join(f'{value:.5E}' for value in row) for row in values) + '\n').encode()
+        payload = values.T.astype('>f4').tobytes()
+        size = str(len(payload)).encode()
+        block = b'#' + str(len(size)).encode() + size + payload + b'\n'
+
+        def reply(command: str) -> bytes:
+            if command.startswith(':MEAS?'):
+                return measure
+            if command.startswith(':NUM:NORM:VAL?'):
+                return block
+            return b''
+
+        return PowerAnalyzer('127.0.0.1', 0, self._pwa_config.buffer_size, 1.0, 1e-9, self._pwa_config.history_size,
+                             list(range(1, channels + 1)), self._pwa_config.quantities, mode, False,
+                             lambda: ReplyTransport(reply))
+
+    def _power_analyzer(self, channels: int, mode: str) -> Callable[[], dict]:
+        def benchmark() -> dict:
+            pwa = self._pwa(channels, mode)
+            try:
+                return {**_measure(_loop(pwa._read_values), self._repeat, self._min_time), 'items': channels}
+            finally:
+                pwa.shutdown()
+
+        return benchmark
+
+    def _read(self, channels: int) -> Callable[[], dict]:
+        def benchmark() -> dict:
+            pwa = self._pwa(channels, 'measure')
+            try:
+                pwa._read_values()
+                return {**_measure(_loop(lambda: pwa.read.to_dict()), self._repeat, self._min_time),
+                        'items': channels}
+            finally:
+                pwa.shutdown()
+
+        return benchmark
+
+    def _snapshot_parts(self) -> tuple[dict, dict, dict[str, RollingStats]]:
+        pwa_fields = tuple(self._pwa_config.quantities)
+        arduino_fields = ('voltage', 'current')
+        stats = {'pwa': RollingStats('benchmark_pwa', self._stats_config.windows, self._stats_config.limits),
+                 'arduino': RollingStats('benchmark_arduino', self._stats_config.windows, self._stats_config.limits)}
+        for sequence in range(1, 1001):
+            stats['pwa'].update(_sample(len(self._pwa_config.channels), pwa_fields, self._rng, sequence))
+            stats['arduino'].update(_sample(2, arduino_fields, self._rng, sequence))
+        calibration = _calibration()
+        calibration = {channel: {'k': calibration[channel]['k'], 'm': calibration[channel]['m']}
+                       for channel in ('channel1', 'channel2')}
+        return {'pwa': stats['pwa'].latest}, {'arduino': (stats['arduino'].latest, calibration)}, stats
+
+    def _assemble(self, sequence: int, parts: tuple[dict, dict, dict[str, RollingStats]]) -> Snapshot:
+        power_analyzers, arduinos, stats = parts
+        now = time.time()
+        return Snapshot(sequence, now, power_analyzers, arduinos,
+                        {name: rolling.summary(now) for name, rolling in stats.items()})
+
+    def _snapshot(self) -> dict:
+        parts = self._snapshot_parts()
+        return _measure(_loop(lambda: self._assemble(1, parts)), self._repeat, self._min_time)
+
+    def _encode(self) -> dict:
+        parts = self._snapshot_parts()
+
+        def run(number: int) -> float:
+            snapshots = [self._assemble(sequence, parts) for sequence in range(1, number + 1)]
+            started = time.perf_counter()
+            for snapshot in snapshots:
+                snapshot.json
+            return time.perf_counter() - started
+
+        return {**_measure(run, self._repeat, self._min_time), 'bytes': len(self._assemble(1, parts).json)}
+
+    def _broadcast(self, clients: int, encoding: str) -> Callable[[], dict]:
+        def benchmark() -> dict:
+            parts = self._snapshot_parts()
+            layout = ([('time',)] + [('pwa', channel, field) for channel in parts[0]['pwa'].channels
+                                     for field in parts[0]['pwa'].fields]
+                      + [('arduino', 'channels', channel, field) for channel in parts[1]['arduino'][0].channels
+                         for field in parts[1]['arduino'][0].fields])
+            broadcaster = Broadcaster(layout)
+            loop = asyncio.new_event_loop()
+            delivered = [0]
+            done = [None, 0]
+
+            def deliver() -> None:
+                delivered[0] += 1
+                if delivered[0] >= done[1]:
+                    done[0].set()
+
+            websockets = [FakeWebSocket(deliver) for _ in range(clients)]
+
+            async def setup() -> list[asyncio.Task]:
+                tasks = [asyncio.create_task(broadcaster.serve(websocket, None, encoding)) for websocket in websockets]
+                while broadcaster.clients < clients:
+                    await asyncio.sleep(0)
+                return tasks
+
+            async def publish(snapshots: list[Snapshot]) -> float:
+                started = time.perf_counter()
+                for snapshot in snapshots:
+                    done[0] = asyncio.Event()
+                    done[1] = delivered[0] + clients
+                    broadcaster.publish(snapshot)
+                    await done[0].wait()
+                return time.perf_counter() - started
+
+            def run(number: int) -> float:
+                snapshots = [self._assemble(sequence, parts) for sequence in range(1, number + 1)]
+                return loop.run_until_complete(publish(snapshots))
+
+            tasks = loop.run_until_complete(setup())
+            try:
+                return {**_measure(run, self._repeat, self._min_time), 'items': clients}
+            finally:
+                for websocket in websockets:
+                    websocket.close()
+                loop.run_until_complete(asyncio.gather(*tasks))
+                loop.close()
+
+        return benchmark
+
+    def _regression(self) -> dict:
+        currents = range(self._api_config.calibration_current_start, self._api_config.calibration_current_max + 10,
+                         self._api_config.calibration_current_step)
+        x = np.repeat(np.array(currents, dtype=np.float64), self._api_config.samples)
+        x += self._rng.normal(0, 0.5, size=len(x))
+        y = 2.5 - 0.0016 * x + self._rng.normal(0, 0.002, size=len(x))
+        y[self._rng.choice(len(y), size=len(y) // 100, replace=False)] += 0.5
+        return {**_measure(_loop(lambda: regression(x, y)), self._repeat, self._min_time), 'items': len(x)}
+
+    def _simulated_config(self, directory: Path) -> Path:
+        with open(CONFIG_PATH) as stream:
+            config = yaml.safe_load(stream)
+        config['simulation']['enabled'] = True
+        config['trace'] = {'mode': 'live', 'path': None, 'speed': 1}
+        config['daemon']['enabled'] = False
+        config['api']['measurement_path'] = str(directory / 'measurements')
+        config['api']['calibration_path'] = str((CONFIG_PATH.parent.parent / self._api_config.calibration_path)
+                                                .resolve())
+        path = directory / 'config.yaml'
+        with open(path, 'w') as stream:
+            yaml.safe_dump(config, stream)
+        return path
+
+    def _startup(self, server: bool) -> Callable[[], dict]:
+        code = ('import sys, time; from pathlib import Path; started = time.perf_counter(); '
+                'from src.api.api_server import APIServer; '
+                f'{"APIServer(Path(sys.argv[1])); " if server else ""}print(time.perf_counter() - started)')
+
+        def benchmark() -> dict:
+            with tempfile.TemporaryDirectory() as directory:
+                config_path = self._simulated_config(Path(directory))
+
+                def run(number: int) -> float:
+                    elapsed = 0.0
+                    for _ in range(number):
+                        result = subprocess.run([sys.executable, '-c', code, str(config_path)], cwd=BACKEND_PATH,
+                                                capture_output=True, text=True, check=True)
+                        elapsed += float(result.stdout.strip().splitlines()[-1])
+                    return elapsed
+
+                return _measure(run, min(self._repeat, 5), 0.0)
+
+        return benchmark
+
+    def all(self) -> dict[str, Callable[[], dict]]:
+        benchmarks = {}
+        for lines in (10, 100):
+            benchmarks[f'arduino.update_values.lines{lines}'] = self._arduino(lines, [])
+        benchmarks['arduino.update_values.filtered.lines100'] = self._arduino(100, self._arduino_config.filters)
+        for mode in ('measure', 'numeric'):
+            for channels in (4, 8, 16):
+                benchmarks[f'power_analyzer.read_values.{mode}.channels{channels}'] = (
+                    self._power_analyzer(channels, mode))
+        for channels in (4, 16):
+            benchmarks[f'power_analyzer.read.channels{channels}'] = self._read(channels)
+        benchmarks['snapshot.assemble'] = self._snapshot
+        benchmarks['snapshot.encode'] = self._encode
+        for encoding in ('json', 'binary'):
+            for clients in (1, 10, 100):
+                benchmarks[f'broadcast.{encoding}.clients{clients}'] = self._broadcast(clients, encoding)
+        benchmarks['utils.regression.calibration'] = self._regression
+        benchmarks['startup.import'] = self._startup(False)
+        benchmarks['startup.server'] = self._startup(True)
+        return benchmarks
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> dict[str, dict]:
+    comparison = {}
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        ratio = result['min'] / reference['min']
+        status = 'regression' if ratio > 1 + threshold else 'improvement' if ratio < 1 / (1 + threshold) else 'ok'
+        comparison[name] = {'baseline': reference['min'], 'current': result['min'], 'ratio': ratio,
+                            'status': status}
+    return comparison
+
+
+def _format(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.3f} {unit}'
+    return f'{seconds / 1e-9:.1f} ns'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the backend hot paths with in-process fakes.')
+    parser.add_argument('filter', nargs='*', help='only run benchmarks whose name contains one of these')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.1, help='seconds per repeat')
+    parser.add_argument('--threshold', type=float, default=0.3, help='relative slowdown of the fastest repeat reported as regression')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--output', type=Path, default=None)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    args = parser.parse_args()
+
+    benchmarks = Benchmarks(args.repeat, args.min_time).all()
+    results = {}
+    for name, benchmark in benchmarks.items():
+        if args.filter and not any(pattern in name for pattern in args.filter):
+            continue
+        try:
+            result = benchmark()
+        except Exception as e:
+            print('Error: ', name, e)
+            continue
+        if 'items' in result:
+            result['throughput'] = result['items'] / result['median']
+        results[name] = result
+        print(f'{name:<50} {_format(result["median"]):>12} ±{_format(result["stdev"]):>12}')
+
+    baseline = None
+    if args.baseline.exists() and not args.save_baseline:
+        with open(args.baseline) as stream:
+            baseline = json.load(stream)
+    report = {'time': datetime.datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+              'numpy': np.__version__, 'platform': platform.platform(), 'machine': platform.machine(),
+              'baseline': str(args.baseline) if baseline is not None else None, 'results': results,
+              'comparison': compare(results, baseline['results'], args.threshold) if baseline is not None else {}}
+
+    for name, entry in report['comparison'].items():
+        if entry['status'] != 'ok':
+            print(f'{entry["status"]}: {name} {_format(entry["baseline"])} -> {_format(entry["current"])} '
+                  f'({entry["ratio"]:.2f}x)')
+
+    if args.save_baseline:
+        output = args.baseline
+    elif args.output is not None:
+        output = args.output
+    else:
+        api_config = APIConfig.from_yaml(CONFIG_PATH)
+        measurement_path = Path(api_config.measurement_path) if api_config.measurement_path is not None else (
+            CONFIG_PATH.parent.parent / 'measurements')
+        output = measurement_path / 'benchmarks' / f'benchmark_{datetime.datetime.now():%Y-%m-%d_%H-%M-%S}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as stream:
+        json.dump(report, stream, indent=2)
+    print(f'Results written to {output}')
+    if any(entry['status'] == 'regression' for entry in report['comparison'].values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
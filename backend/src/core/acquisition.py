@@ -0,0 +1,379 @@
+import asyncio
+import csv
+import datetime
+import threading
+import time
+import uuid
+import yaml
+import numpy as np
+from pathlib import Path
+from typing import Callable
+from src.api.snapshot import Snapshot
+from src.core.capture import Capture
+from src.core.recorder import Recorder
+from src.core.registry import InstrumentRegistry
+from src.core.statistics import RollingStats
+from src.core.sweep import Sweep
+from src.core.transport import TraceRecorder, TraceReplay
+from src.simulation.simulator import Simulation
+from src.utils.config import (APIConfig, PowerSupplyConfig, PowerAnalyzerConfig, ArduinoConfig, RecorderConfig,
+                              SimulationConfig, StatsConfig, TraceConfig, CaptureConfig)
+from src.utils.job import Job
+from src.utils.metrics import METRICS, SNAPSHOT_JITTER
+from src.utils.scheduler import Deadline
+from src.utils.utils import regression, align, robust_mask, lttb, min_max
+
+
+class Acquisition:
+    _job_retention = 3600.0
+    _job_limit = 50
+
+    def __init__(self, config_path: Path):
+        api_config = APIConfig.from_yaml(config_path)
+        psu_config = PowerSupplyConfig.from_yaml(config_path)
+        pwa_config = PowerAnalyzerConfig.from_yaml(config_path)
+        arduino_config = ArduinoConfig.from_yaml(config_path)
+        recorder_config = RecorderConfig.from_yaml(config_path)
+        simulation_config = SimulationConfig.from_yaml(config_path)
+        stats_config = StatsConfig.from_yaml(config_path)
+        trace_config = TraceConfig.from_yaml(config_path)
+        capture_config = CaptureConfig.from_yaml(config_path)
+        self._measurement_path = Path(api_config.measurement_path) if api_config.measurement_path is not None else (
+            config_path.parent.parent / 'measurements')
+        self._trace = None
+        if trace_config.mode == 'record':
+            name = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+            self._trace = TraceRecorder(Path(trace_config.path) if trace_config.path is not None else (
+                self._measurement_path / 'traces' / f'trace_{name}.bin'))
+        elif trace_config.mode == 'replay':
+            self._trace = TraceReplay(Path(trace_config.path), trace_config.speed)
+        self._simulation = None
+        addresses = None
+        if simulation_config.enabled and trace_config.mode != 'replay':
+            self._simulation = Simulation(simulation_config, len(psu_config.ip), len(pwa_config.ip),
+                                          len(arduino_config.ip))
+            addresses = self._simulation.start()
+        self._calibration_path = config_path.parent.parent / api_config.calibration_path
+        with open(self._calibration_path) as stream:
+            calibration = yaml.safe_load(stream)
+        self._instruments = InstrumentRegistry.from_config(psu_config, pwa_config, arduino_config, calibration,
+                                                           addresses, self._trace)
+        self._instruments.connect()
+        self._calibration_psu = next(iter(self._instruments.power_supplies.values()))
+        self._pwa_sampling_frequency = pwa_config.sampling_frequency
+        self._pwa = next(iter(self._instruments.power_analyzers.values()))
+        self._arduino = next(iter(self._instruments.arduinos.values()))
+        self._sample_frequency = api_config.sample_frequency * (
+            trace_config.speed if trace_config.mode == 'replay' and trace_config.speed > 0 else 1)
+        self._calibration_current_start = api_config.calibration_current_start
+        self._calibration_current_step = api_config.calibration_current_step
+        self._calibration_current_max = api_config.calibration_current_max
+        self._calibration_samples = api_config.samples
+        self._calibration_channels = api_config.calibration_channels
+        self._calibration_field = api_config.calibration_field
+        self._stats = {name: RollingStats(name, stats_config.windows, stats_config.limits) for name in
+                       [*self._instruments.power_analyzers, *self._instruments.arduinos]}
+        for name, instrument in {**self._instruments.power_analyzers, **self._instruments.arduinos}.items():
+            instrument.add_listener(self._stats[name].update)
+        self._instance = uuid.uuid4().hex[:12]
+        self._latest_snapshot = self._snapshot(0)
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._calibration_job = None
+        self._sweep_job = None
+        self._capture_job = None
+        self._boost_rate = capture_config.boost_rate
+        self._max_capture = capture_config.max_duration
+        self._history = {name: instrument.history for name, instrument in
+                         {**self._instruments.power_analyzers, **self._instruments.arduinos}.items()}
+        self._history.update({f'{name}_filtered': arduino.filtered_history
+                              for name, arduino in self._instruments.arduinos.items()
+                              if arduino.filtered_history is not None})
+        self._recorder = Recorder(
+            self._measurement_path,
+            {name: [(channel, field) for channel, history in histories.items() for field in history.fields]
+             for name, histories in self._history.items()},
+            recorder_config.max_chunk_size, recorder_config.max_chunk_duration, recorder_config.flush_interval,
+            recorder_config.queue_size)
+        for name, instrument in {**self._instruments.power_analyzers, **self._instruments.arduinos}.items():
+            instrument.add_listener(lambda sample, stream=name: self._recorder.write(stream, sample))
+        for name, arduino in self._instruments.arduinos.items():
+            if arduino.filtered_history is not None:
+                arduino.add_listener(lambda sample, stream=f'{name}_filtered': self._recorder.write(stream, sample),
+                                     filtered=True)
+        self._publish = None
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._update_snapshot, daemon=True)
+
+    def start(self, publish: Callable[[Snapshot], None] | None = None) -> None:
+        self._publish = publish
+        self._worker.start()
+
+    def _update_snapshot(self) -> None:
+        deadline = Deadline(self._sample_frequency, 'snapshot')
+        jitter = SNAPSHOT_JITTER.labels()
+        previous = time.monotonic()
+        while deadline.wait(self._stop):
+            now = time.monotonic()
+            jitter.observe(abs(now - previous - deadline.period))
+            previous = now
+            snapshot = self._snapshot(self._latest_snapshot.sequence + 1)
+            self._latest_snapshot = snapshot
+            if self._publish is not None:
+                try:
+                    self._publish(snapshot)
+                except Exception as e:
+                    print('Error: ', e)
+
+    def _snapshot(self, sequence: int) -> Snapshot:
+        now = time.time()
+        return Snapshot(sequence, now,
+                        {name: self._stats[name].latest for name in self._instruments.power_analyzers},
+                        {name: (arduino.filtered, arduino.calibration)
+                         for name, arduino in self._instruments.arduinos.items()},
+                        {name: stats.summary(now) for name, stats in self._stats.items()})
+
+    def snapshot(self) -> Snapshot:
+        return self._latest_snapshot
+
+    def instance(self) -> str:
+        return self._instance
+
+    def measurement_path(self) -> Path:
+        return self._measurement_path
+
+    def layout(self) -> list[tuple[str, ...]]:
+        return ([('time',)]
+                + [(name, channel, field) for name, pwa in self._instruments.power_analyzers.items()
+                   for channel, history in pwa.history.items() for field in history.fields]
+                + [(name, 'channels', channel, field) for name, arduino in self._instruments.arduinos.items()
+                   for channel, history in arduino.history.items() for field in history.fields])
+
+    def health(self) -> dict[str, dict[str, dict]]:
+        return self._instruments.health
+
+    def metrics(self, exclude: tuple[str, ...] = ()) -> str:
+        return METRICS.render(exclude=exclude)
+
+    def stats(self, instrument: str | None = None) -> dict:
+        now = time.time()
+        if instrument is None:
+            return {'time': now, **{name: stats.summary(now) for name, stats in self._stats.items()}}
+        stats = self._stats.get(instrument)
+        if stats is None:
+            raise KeyError(f'Unknown instrument: {instrument}')
+        return {'time': now, instrument: stats.summary(now)}
+
+    def history(self, channel: str, since: float | None, max_points: int, method: str,
+                field: str | None) -> tuple[np.ndarray, np.ndarray, tuple[str, ...]]:
+        instrument, _, name = channel.partition('.')
+        history = self._history.get(instrument, {}).get(name)
+        if history is None:
+            raise KeyError(f'Unknown channel: {channel}')
+        field = field if field is not None else history.fields[0]
+        if field not in history.fields:
+            raise ValueError(f'Unknown field: {field}')
+        times, values = history.since(since)
+        column = values[:, history.fields.index(field)]
+        if method == 'lttb':
+            indices = lttb(times, column, max_points)
+        else:
+            indices = min_max(column, max_points)
+        return times[indices], values[indices], history.fields
+
+    def recorder(self) -> dict:
+        return self._recorder.status
+
+    def start_recorder(self, name: str | None) -> dict:
+        return self._recorder.start(name)
+
+    def stop_recorder(self) -> dict:
+        return self._recorder.stop()
+
+    def _power_supply(self, psu_id: str):
+        try:
+            return self._instruments.power_supply(psu_id)
+        except KeyError:
+            raise KeyError(f'Unknown power supply: {psu_id}')
+
+    async def power_supplies(self) -> list[dict[str, float | bool | str]]:
+        states = await asyncio.gather(*(psu.get_state() for psu in self._instruments.power_supplies.values()))
+        return [{'id': psu_id, **state} for psu_id, state in zip(self._instruments.power_supplies, states)]
+
+    async def power_supply(self, psu_id: str) -> dict[str, float | bool]:
+        return await self._power_supply(psu_id).get_state()
+
+    async def toggle(self, psu_id: str) -> bool:
+        return await self._power_supply(psu_id).on_off_async()
+
+    async def apply(self, commands: list[dict]) -> list[dict[str, float | bool | str]]:
+        supplies = [self._power_supply(command['id']) for command in commands]
+        for psu, command in zip(supplies, commands):
+            psu.validate(command.get('voltage'), command.get('current'))
+        states = await asyncio.gather(*(self._apply(psu, command) for psu, command in zip(supplies, commands)))
+        return [{'id': command['id'], **state} for command, state in zip(commands, states)]
+
+    @staticmethod
+    async def _apply(psu, command: dict) -> dict[str, float | bool]:
+        await asyncio.wrap_future(psu.apply(command.get('voltage'), command.get('current'), command.get('on')))
+        return await psu.get_state()
+
+    def _busy(self) -> bool:
+        return any(job is not None and job.running for job in (self._calibration_job, self._sweep_job))
+
+    def _track(self, job: Job) -> Job:
+        now = time.time()
+        finished = sorted((other for other in self._jobs.values() if not other.running),
+                          key=lambda other: other.finished)
+        for index, old in enumerate(finished):
+            if now - old.finished > self._job_retention or len(finished) - index > self._job_limit:
+                del self._jobs[old.id]
+        self._jobs[job.id] = job
+        return job.start()
+
+    def calibrate(self, save_file: bool) -> dict:
+        for pwa_channel in self._calibration_channels.values():
+            history = self._pwa.history.get(pwa_channel)
+            if history is None:
+                raise ValueError(f'Unknown power analyzer channel in calibration config: {pwa_channel}')
+            if self._calibration_field not in history.fields:
+                raise ValueError(f'Calibration field {self._calibration_field!r} is not a configured power analyzer '
+                                 f'quantity ({", ".join(history.fields)})')
+        with self._jobs_lock:
+            if self._busy():
+                raise RuntimeError('A calibration or sweep is already running')
+            job = Job('calibration', lambda running: self._calibrate_sensor(running, save_file))
+            self._calibration_job = self._track(job)
+        return job.status
+
+    def sweep(self, steps: list[dict], repeat: int, ramp_rate: float, settle: dict | None) -> dict:
+        sweep = Sweep(self._instruments, steps, repeat, ramp_rate, settle)
+        with self._jobs_lock:
+            if self._busy():
+                raise RuntimeError('A sweep or calibration is already running')
+            job = Job('sweep', sweep.run)
+            self._sweep_job = self._track(job)
+        return job.status
+
+    def capture(self, trigger: dict, pre: float, post: float, rate: float | None, timeout: float | None) -> dict:
+        capture = Capture(self._instruments, trigger, pre, post, rate or self._boost_rate, timeout, self._max_capture)
+        with self._jobs_lock:
+            if self._capture_job is not None and self._capture_job.running:
+                raise RuntimeError('A capture is already armed')
+            job = Job('capture', capture.run)
+            self._capture_job = self._track(job)
+        return self._status(job, False)
+
+    def _job(self, job_id: str) -> Job:
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f'Unknown job: {job_id}')
+        return job
+
+    @staticmethod
+    def _status(job: Job, result: bool) -> dict:
+        status = job.status
+        if not result:
+            del status['result']
+        return status
+
+    def job(self, job_id: str, since: int = 0, result: bool = True) -> tuple[dict, int, list]:
+        job = self._job(job_id)
+        version = job.version
+        return self._status(job, result), version, job.events(since)
+
+    def result(self, job_id: str):
+        job = self._job(job_id)
+        if job.running:
+            raise RuntimeError(f'Job {job_id} has not finished')
+        return job.result
+
+    def cancel(self, job_id: str, result: bool = True) -> dict:
+        job = self._job(job_id)
+        job.cancel()
+        return self._status(job, result)
+
+    def _calibrate_sensor(self, job: Job, save_file: bool) -> dict[str, dict[str, float]]:
+        measurements = {channel: [] for channel in self._calibration_channels}
+        currents = [i for i in range(self._calibration_current_start, self._calibration_current_max + 10,
+                                     self._calibration_current_step)]
+        reference = self._arduino.history[next(iter(self._calibration_channels))]
+        max_gap = 2 / self._pwa_sampling_frequency
+        total = len(currents) * self._calibration_samples
+        started = time.monotonic()
+        self._calibration_psu.voltage = 1
+        self._calibration_psu.current = 0
+        self._calibration_psu.on_off()
+        try:
+            for step, current in enumerate(currents, 1):
+                self._calibration_psu.current = current
+                job.update(step=step, steps=len(currents), setpoint=current, samples=0)
+                job.sleep(0.5)
+                start = time.time()
+                first = reference.total
+                samples = 0
+                while samples < self._calibration_samples:
+                    job.check()
+                    if not self._arduino.wait_for_sample(timeout=1):
+                        continue
+                    samples = min(reference.total - first, self._calibration_samples)
+                    collected = (step - 1) * self._calibration_samples + samples
+                    eta = (time.monotonic() - started) / collected * (total - collected) if collected else None
+                    job.update(samples=samples, collected=collected, total=total, eta=eta)
+                for arduino_channel, pwa_channel in self._calibration_channels.items():
+                    arduino_times, arduino_values = self._arduino.history[arduino_channel].since(start)
+                    pwa_times, pwa_values = self._pwa.history[pwa_channel].since(start - max_gap)
+                    pwa_current = pwa_values[:, self._pwa.history[pwa_channel].fields.index(self._calibration_field)]
+                    valid = robust_mask(pwa_current)
+                    aligned = align(arduino_times, pwa_times[valid], pwa_current[valid], max_gap)
+                    measurements[arduino_channel].append((current, aligned, arduino_values[:, 0]))
+        finally:
+            self._calibration_psu.voltage = 0
+            self._calibration_psu.current = 0
+            if self._calibration_psu.on:
+                self._calibration_psu.on_off()
+        results = {}
+        for channel, steps in measurements.items():
+            try:
+                fit = regression(np.concatenate([pwa for _, pwa, _ in steps]),
+                                 np.concatenate([arduino for _, _, arduino in steps]))
+            except ValueError as e:
+                print('Error: ', e)
+                results[channel] = {'error': f'{channel} keeps its previous calibration: {e}'}
+                continue
+            self._arduino.calibrate(channel, fit.k, fit.m)
+            results[channel] = fit.to_dict()
+        if save_file:
+            self._write_to_file(measurements)
+        if all('error' in result for result in results.values()):
+            raise ValueError('; '.join(result['error'] for result in results.values()))
+        with open(self._calibration_path, 'w', encoding='utf-8') as stream:
+            yaml.safe_dump({channel: {'k': self._arduino.calibration[channel]['k'],
+                                      'm': self._arduino.calibration[channel]['m']}
+                            for channel in measurements}, stream, sort_keys=False)
+        return results
+
+    def _write_to_file(self, measurements: dict[str, list[tuple[float, np.ndarray, np.ndarray]]]):
+        name = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        path = self._measurement_path / f'measurements_{name}.csv'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('a', newline='', encoding='utf-8') as stream:
+            writer = csv.writer(stream)
+            writer.writerow(['Channel:', 'Currents:', 'Power analyzer current:', 'Arduino voltage:'])
+            for channel, steps in measurements.items():
+                for current, pwa_measurements, arduino_measurements in steps:
+                    for pwa_measurement, arduino_measurement in zip(pwa_measurements, arduino_measurements):
+                        writer.writerow([channel, current, pwa_measurement, arduino_measurement])
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        if self._worker.is_alive():
+            self._worker.join(timeout=1)
+        if self._recorder.status['recording']:
+            self._recorder.stop()
+        self._instruments.shutdown()
+        if self._trace is not None:
+            self._trace.close()
+        if self._simulation is not None:
+            self._simulation.stop()
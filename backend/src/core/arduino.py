@@ -1,86 +1,190 @@
 import threading
 import time
+import numpy as np
+from typing import Callable
 from src.core.instrument import Instrument
+from src.core.sample import Sample
+from src.core.transport import Transport
+from src.utils.metrics import INSTRUMENT_ERRORS, SAMPLES, SAMPLE_RATE, RateMeter
+from src.utils.dsp import FilterChain
+from src.utils.ring_buffer import RingBuffer
 
 
 class Arduino(Instrument):
+    _max_batch_gap = 1.0
+
     def __init__(self, ip: str, port: int, buffer_size: int, timeout: float, sampling_frequency: float,
-                 calibration: dict[str, float | None]):
-        super().__init__(ip, port, buffer_size, timeout)
+                 calibration: dict, history_size: int, filters: list[dict] | None = None,
+                 transport: Callable[[], Transport] | None = None):
+        super().__init__(ip, port, buffer_size, timeout, transport)
         self._sampling_frequency = sampling_frequency
-        self._latest_value = {}
-        if (calibration['k'] or calibration['m']) is None:
-            self._k = ''
-            self._m = ''
-        else:
-            self._k = calibration['k']
-            self._m = calibration['m']
+        self._latest_value = None
+        self._latest_filtered = None
+        self._sequence = 0
+        self._filtered_sequence = 0
+        self._batch_time = None
+        self._interval = 1 / sampling_frequency
+        self._channels = ('channel1', 'channel2')
+        self._fields = ('voltage', 'current')
+        self._history = {channel: RingBuffer(history_size, self._fields) for channel in self._channels}
+        self._filter = FilterChain(filters or [])
+        self._filtered_history = {channel: RingBuffer(history_size, self._fields) for channel in self._channels}
+        self._calibration = {}
+        for channel in self._channels:
+            coefficients = calibration.get(channel, calibration) or {}
+            self.calibrate(channel, coefficients.get('k'), coefficients.get('m'))
+        self._listeners = []
+        self._filtered_listeners = []
+        self._sample_count = 0
+        self._sample_ready = threading.Condition()
+        self._samples = SAMPLES.labels(self._name)
+        self._rate = RateMeter(SAMPLE_RATE.labels(self._name))
         self._stop = threading.Event()
         self._worker = threading.Thread(target=self._update_values, daemon=True)
         self._worker.start()
 
-    def _subscribe(self) -> None:
-        self._send_command('subscribe')
+    def _handshake(self, first: bool) -> list[str]:
+        return ['subscribe']
 
     def _unsubscribe(self) -> None:
         self._send_command('unsubscribe')
 
-    def _read_line(self) -> str:
-        line = []
-        while True:
-            message = self._socket.recv(1)
-            if message == b'\n':
-                return ''.join(line)
-            else:
-                line.append(message.decode('utf-8'))
+    def _parse_lines(self, lines: list[str]) -> np.ndarray:
+        try:
+            raw = np.array(','.join(lines).split(','), dtype=np.int64)
+            if raw.size == len(lines) * len(self._channels):
+                return raw.reshape(len(lines), len(self._channels)).astype(np.float64)
+        except ValueError:
+            pass
+        rows = []
+        for line in lines:
+            try:
+                row = [int(value) for value in line.split(',')]
+                if len(row) != len(self._channels):
+                    raise ValueError(f'Expected {len(self._channels)} values, got: {line!r}')
+            except ValueError as e:
+                INSTRUMENT_ERRORS.labels(self._name, 'parse').inc()
+                print('Error: ', e)
+                continue
+            rows.append(row)
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(self._channels))
+
+    def _coefficients(self) -> tuple[np.ndarray, np.ndarray]:
+        calibration = self._calibration
+        k = [calibration[channel]['k'] if calibration[channel]['k'] != '' else np.nan for channel in self._channels]
+        m = [calibration[channel]['m'] if calibration[channel]['m'] != '' else np.nan for channel in self._channels]
+        return np.array(k, dtype=np.float64), np.array(m, dtype=np.float64)
+
+    def _convert(self, voltage: np.ndarray, k: np.ndarray, m: np.ndarray) -> np.ndarray:
+        values = np.empty((len(voltage), len(self._channels) * len(self._fields)), dtype=np.float64)
+        values[:, 0::2] = voltage
+        values[:, 1::2] = (voltage - m) / k
+        return values
+
+    def _publish(self, times: np.ndarray, values: np.ndarray, history: dict[str, RingBuffer],
+                 listeners: list[Callable[[Sample], None]], sequence: int) -> Sample | None:
+        width = len(self._fields)
+        for i, channel in enumerate(self._channels):
+            history[channel].extend(times, values[:, i * width:(i + 1) * width])
+        sample = None
+        for timestamp, row in zip(times.tolist(), values.tolist()):
+            sequence += 1
+            sample = Sample(timestamp, sequence, self._channels, self._fields, tuple(row))
+            for listener in listeners:
+                listener(sample)
+        return sample
+
+    def _timestamps(self, count: int) -> np.ndarray:
+        now = time.time()
+        if self._batch_time is not None and 0 < now - self._batch_time <= self._max_batch_gap:
+            self._interval = (now - self._batch_time) / count
+        self._batch_time = now
+        return now - self._interval * np.arange(count - 1, -1, -1, dtype=np.float64)
 
     def _update_values(self) -> None:
-        self._subscribe()
         while not self._stop.is_set():
             try:
-                value = self._read_line()
-                value = value.split(',')
-                voltage_channel1 = int(value[0]) / 1023 * 3.3
-                voltage_channel2 = int(value[1]) / 1023 * 3.3
-                current_channel1 = ''
-                current_channel2 = ''
-                if (self._k and self._m) != '':
-                    current_channel1 = (voltage_channel1 - self._m) / self._k
-                    current_channel2 = (voltage_channel2 - self._m) / self._k
-                value = {'channels':
-                             {'channel1': {'voltage': voltage_channel1,
-                                           'current': current_channel1},
-                              'channel2': {'voltage': voltage_channel2,
-                                           'current': current_channel2}, },
-                         'calibration': {'k': self._k, 'm': self._m}}
-                self._latest_value = value
+                lines = self._read_lines()
             except Exception as e:
                 print('Error: ', e)
+                self._batch_time = None
+                if not self.connected:
+                    self._stop.wait(self.retry_delay)
+                continue
+            raw = self._parse_lines(lines)
+            if not len(raw):
                 continue
-            time.sleep(1 / self._sampling_frequency)
-        self._unsubscribe()
+            times = self._timestamps(len(raw))
+            voltage = raw * (3.3 / 1023)
+            k, m = self._coefficients()
+            sample = self._publish(times, self._convert(voltage, k, m), self._history, self._listeners,
+                                   self._sequence)
+            self._sequence = sample.sequence
+            self._latest_value = sample
+            if self._filter:
+                times, voltage = self._filter(times, voltage)
+                filtered = self._publish(times, self._convert(voltage, k, m), self._filtered_history,
+                                         self._filtered_listeners, self._filtered_sequence)
+                if filtered is not None:
+                    self._filtered_sequence = filtered.sequence
+                    self._latest_filtered = filtered
+            else:
+                self._latest_filtered = sample
+            self._samples.inc(len(raw))
+            self._rate.tick(len(raw))
+            with self._sample_ready:
+                self._sample_count += 1
+                self._sample_ready.notify_all()
+        if self.connected:
+            try:
+                self._unsubscribe()
+            except Exception as e:
+                print('Error: ', e)
+
+    def wait_for_sample(self, timeout: float | None = None) -> bool:
+        with self._sample_ready:
+            count = self._sample_count
+            return self._sample_ready.wait_for(lambda: self._sample_count != count, timeout)
+
+    def add_listener(self, listener: Callable[[Sample], None], filtered: bool = False) -> None:
+        if filtered:
+            self._filtered_listeners = self._filtered_listeners + [listener]
+        else:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener: Callable[[Sample], None]) -> None:
+        self._listeners = [existing for existing in self._listeners if existing != listener]
+        self._filtered_listeners = [existing for existing in self._filtered_listeners if existing != listener]
 
     @property
-    def read(self) -> dict[str, dict[str, float]]:
+    def read(self) -> Sample | None:
         return self._latest_value
 
     @property
-    def k(self) -> float | str:
-        return self._k
+    def filtered(self) -> Sample | None:
+        return self._latest_filtered
+
+    @property
+    def history(self) -> dict[str, RingBuffer]:
+        return self._history
 
-    @k.setter
-    def k(self, k: float) -> None:
-        self._k = k
+    @property
+    def filtered_history(self) -> dict[str, RingBuffer] | None:
+        return self._filtered_history if self._filter else None
+
+    @property
+    def channels(self) -> tuple[str, ...]:
+        return self._channels
 
     @property
-    def m(self) -> float | str:
-        return self._m
+    def calibration(self) -> dict[str, dict[str, float | str]]:
+        return self._calibration
 
-    @m.setter
-    def m(self, m: float) -> None:
-        self._m = m
+    def calibrate(self, channel: str, k: float | None, m: float | None) -> None:
+        coefficients = {'k': '', 'm': ''} if k is None or m is None else {'k': k, 'm': m}
+        self._calibration = {**self._calibration, channel: coefficients}
 
     def shutdown(self) -> None:
         self._stop.set()
         self._worker.join(timeout=self._timeout)
-        self._socket.close()
+        self._close()
@@ -0,0 +1,172 @@
+import math
+import threading
+import time
+import numpy as np
+from collections import deque
+from src.core.registry import InstrumentRegistry
+from src.core.sample import Sample
+from src.utils.job import Job
+
+DIRECTIONS = {'threshold': ('above', 'below'), 'edge': ('rising', 'falling', 'either')}
+COMMANDS = ('on', 'off', 'voltage', 'current', 'any')
+
+
+def _values(values: np.ndarray) -> list[float | None]:
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+
+class Capture:
+    _poll = 0.05
+    _grace = 0.1
+
+    def __init__(self, instruments: InstrumentRegistry, trigger: dict, pre: float, post: float, rate: float,
+                 timeout: float | None, max_duration: float):
+        if pre < 0 or post <= 0 or pre + post > max_duration:
+            raise ValueError(f'pre must not be negative, post must be positive and pre + post at most {max_duration}')
+        if rate <= 0 or (timeout is not None and timeout <= 0):
+            raise ValueError('rate and timeout must be positive')
+        kind = trigger['type']
+        self._sources = {**instruments.power_analyzers, **instruments.arduinos}
+        self._power_analyzers = instruments.power_analyzers
+        self._supplies = {}
+        self._watch = None
+        self._command = None
+        if kind == 'command':
+            try:
+                self._supplies[trigger['psu']] = instruments.power_supply(trigger['psu'])
+            except KeyError:
+                raise ValueError(f'Unknown power supply: {trigger["psu"]}')
+            if trigger['command'] not in COMMANDS:
+                raise ValueError(f'command must be one of {", ".join(COMMANDS)}')
+            self._command = trigger['command']
+        elif kind in DIRECTIONS:
+            instrument, _, channel = (trigger.get('channel') or '').partition('.')
+            history = self._sources[instrument].history.get(channel) if instrument in self._sources else None
+            if history is None:
+                raise ValueError(f'Unknown channel: {trigger.get("channel")}')
+            if trigger['field'] not in history.fields:
+                raise ValueError(f'Unknown field: {trigger["field"]}')
+            if trigger.get('level') is None:
+                raise ValueError(f'A {kind} trigger needs a level')
+            direction = trigger.get('direction') or DIRECTIONS[kind][0]
+            if direction not in DIRECTIONS[kind]:
+                raise ValueError(f'{kind} direction must be one of {", ".join(DIRECTIONS[kind])}')
+            self._watch = (instrument, channel, trigger['field'])
+            self._direction = direction
+            self._level = trigger['level']
+        else:
+            raise ValueError(f'Unknown trigger type: {kind}')
+        self._trigger = trigger
+        self._pre = pre
+        self._post = post
+        self._rate = rate
+        self._timeout = timeout
+        self._buffers = {name: deque() for name in self._sources}
+        self._previous = None
+        self._armed = None
+        self._fired = None
+        self._done = False
+        self._triggered = threading.Event()
+        self._lock = threading.Lock()
+
+    def _crossed(self, value: float) -> bool:
+        if math.isnan(value):
+            return False
+        previous, self._previous = self._previous, value
+        if self._direction == 'above':
+            return value > self._level
+        if self._direction == 'below':
+            return value < self._level
+        if previous is None:
+            return False
+        rising = previous < self._level <= value
+        falling = previous > self._level >= value
+        return rising if self._direction == 'rising' else falling if self._direction == 'falling' else rising or falling
+
+    def _fire(self, timestamp: float, source: str, value: float | dict) -> None:
+        self._fired = {'time': timestamp, 'source': source, 'value': value}
+        for pwa in self._power_analyzers.values():
+            pwa.boost(self._rate)
+        self._triggered.set()
+
+    def _on_sample(self, name: str, sample: Sample) -> None:
+        with self._lock:
+            if self._done:
+                return
+            buffer = self._buffers[name]
+            buffer.append(sample)
+            if self._fired is not None:
+                return
+            horizon = sample.time - self._pre
+            while buffer[0].time < horizon:
+                buffer.popleft()
+            if self._watch is not None and self._watch[0] == name:
+                _, channel, field = self._watch
+                value = sample.get(channel, field)
+                if self._crossed(value) and sample.time >= self._armed:
+                    self._fire(sample.time, '.'.join(self._watch), value)
+
+    def _on_command(self, psu_id: str, state: dict[str, float | bool]) -> None:
+        if self._command in ('on', 'off'):
+            matched = state.get('on') is (self._command == 'on')
+        else:
+            matched = self._command == 'any' or self._command in state
+        if not matched:
+            return
+        with self._lock:
+            if self._fired is None and not self._done:
+                self._fire(time.time(), f'{psu_id}.{self._command}', state)
+
+    def _result(self) -> dict:
+        start = self._fired['time'] - self._pre
+        end = self._fired['time'] + self._post
+        streams = {}
+        for name, buffer in self._buffers.items():
+            samples = [sample for sample in buffer if start <= sample.time <= end]
+            if not samples:
+                streams[name] = {'samples': 0, 'time': [], 'sequence': [], 'channels': {}}
+                continue
+            channels, fields = samples[0].channels, samples[0].fields
+            samples = [sample for sample in samples if (sample.channels, sample.fields) == (channels, fields)]
+            values = np.array([sample.values for sample in samples], dtype=np.float64)
+            width = len(fields)
+            streams[name] = {'samples': len(samples), 'time': [sample.time for sample in samples],
+                             'sequence': [sample.sequence for sample in samples],
+                             'channels': {channel: {field: _values(values[:, i * width + j])
+                                                    for j, field in enumerate(fields)}
+                                          for i, channel in enumerate(channels)}}
+        return {'trigger': {**self._fired, 'condition': self._trigger}, 'pre': self._pre, 'post': self._post,
+                'start': start, 'end': end, 'rate': self._rate, 'streams': streams}
+
+    def run(self, job: Job) -> dict:
+        filling = self._watch is not None
+        self._armed = time.time() + (self._pre if filling else 0.0)
+        listeners = {name: lambda sample, name=name: self._on_sample(name, sample) for name in self._sources}
+        commands = {psu_id: lambda state, psu_id=psu_id: self._on_command(psu_id, state) for psu_id in self._supplies}
+        for name, listener in listeners.items():
+            self._sources[name].add_listener(listener)
+        for psu_id, listener in commands.items():
+            self._supplies[psu_id].add_listener(listener)
+        try:
+            job.update(phase='filling' if filling else 'armed', pre=self._pre, post=self._post)
+            while not self._triggered.wait(self._poll):
+                job.check()
+                now = time.time()
+                if filling and now >= self._armed:
+                    filling = False
+                    job.update(phase='armed')
+                if self._timeout is not None and now - self._armed > self._timeout:
+                    raise TimeoutError(f'Trigger did not fire within {self._timeout} s of arming')
+            job.update(phase='capturing', trigger=self._fired)
+            job.sleep(max(self._fired['time'] + self._post - time.time(), 0.0) + self._grace)
+        finally:
+            for name, listener in listeners.items():
+                self._sources[name].remove_listener(listener)
+            for psu_id, listener in commands.items():
+                self._supplies[psu_id].remove_listener(listener)
+            for pwa in self._power_analyzers.values():
+                pwa.boost(None)
+            with self._lock:
+                self._done = True
+        job.update(phase='done')
+        return self._result()
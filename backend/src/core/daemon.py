@@ -0,0 +1,221 @@
+import asyncio
+import inspect
+import os
+import secrets
+import signal
+import threading
+import time
+from typing import Callable
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from src.api.snapshot import Snapshot
+from src.core.acquisition import Acquisition
+from src.utils.config import DaemonConfig
+from src.utils.shared_ring import SharedRing
+
+REMOTE = ('instance', 'measurement_path', 'layout', 'health', 'metrics', 'stats', 'history', 'recorder',
+          'start_recorder', 'stop_recorder', 'power_supplies', 'power_supply', 'toggle', 'apply', 'calibrate', 'sweep',
+          'capture', 'job', 'result', 'cancel')
+
+
+def _create_authkey(config: DaemonConfig) -> bytes:
+    if config.authkey:
+        return config.authkey.encode()
+    authkey = secrets.token_hex(32)
+    descriptor = os.open(config.authkey_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(descriptor, 0o600)
+    with os.fdopen(descriptor, 'w') as stream:
+        stream.write(authkey)
+    return authkey.encode()
+
+
+def _read_authkey(config: DaemonConfig) -> bytes:
+    if config.authkey:
+        return config.authkey.encode()
+    try:
+        return Path(config.authkey_file).read_text().strip().encode()
+    except OSError as e:
+        raise ConnectionError(f'Acquisition daemon authkey unavailable: {e}')
+
+
+class AcquisitionDaemon:
+    def __init__(self, acquisition: Acquisition, config: DaemonConfig):
+        self._acquisition = acquisition
+        self._ring = SharedRing(config.shared_memory, config.slots, config.slot_size, create=True)
+        self._listener = Listener((config.host, config.port), authkey=_create_authkey(config))
+        self._loop = None
+
+    def _publish(self, snapshot: Snapshot) -> None:
+        self._ring.write(snapshot.sequence, snapshot.json)
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                connection = self._listener.accept()
+            except OSError:
+                return
+            except Exception as e:
+                print('Error: ', e)
+                continue
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection: Connection) -> None:
+        with connection:
+            while True:
+                try:
+                    name, args = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if name not in REMOTE:
+                        raise AttributeError(f'Unknown method: {name}')
+                    result = getattr(self._acquisition, name)(*args)
+                    if inspect.iscoroutine(result):
+                        result = asyncio.run_coroutine_threadsafe(result, self._loop).result()
+                    reply = ('ok', result)
+                except Exception as e:
+                    reply = ('error', e)
+                try:
+                    connection.send(reply)
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    connection.send(('error', RuntimeError(str(e))))
+
+    async def _run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        threading.Thread(target=self._accept, daemon=True).start()
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(signum, stop.set)
+            except NotImplementedError:
+                pass
+        await stop.wait()
+
+    def run(self) -> None:
+        self._acquisition.start(self._publish)
+        try:
+            asyncio.run(self._run())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._listener.close()
+            self._acquisition.shutdown()
+            self._ring.close()
+
+
+class AcquisitionClient:
+    def __init__(self, config: DaemonConfig):
+        self._address = (config.host, config.port)
+        self._config = config
+        self._shared_memory = config.shared_memory
+        self._poll_interval = config.poll_interval
+        self._stop = threading.Event()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._instance = None
+        deadline = time.monotonic() + config.connect_timeout
+        while True:
+            try:
+                instance = self._call('instance')
+                break
+            except ConnectionError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+        self._ring = None
+        self._attach(instance)
+
+    def _attach(self, instance: str) -> None:
+        with self._lock:
+            if self._ring is not None:
+                self._ring.close()
+            self._ring = SharedRing(self._shared_memory)
+            self._instance = instance
+            self._written = -1
+            self._snapshot = Snapshot.from_json(0, b'{}')
+
+    def _connection(self) -> Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            authkey = _read_authkey(self._config)
+            try:
+                connection = Client(self._address, authkey=authkey)
+            except (OSError, AuthenticationError) as e:
+                raise ConnectionError(f'Acquisition daemon unreachable at {self._address[0]}:{self._address[1]}: {e}')
+            self._local.connection = connection
+            if self._instance is not None:
+                connection.send(('instance', ()))
+                _, instance = connection.recv()
+                if instance != self._instance:
+                    self._attach(instance)
+        return connection
+
+    def _call(self, name: str, *args):
+        connection = self._connection()
+        try:
+            connection.send((name, args))
+            status, value = connection.recv()
+        except (EOFError, OSError) as e:
+            connection.close()
+            self._local.connection = None
+            raise ConnectionError(f'Lost connection to the acquisition daemon: {e}')
+        if status == 'error':
+            raise value
+        return value
+
+    def __getattr__(self, name: str):
+        if name not in REMOTE:
+            raise AttributeError(name)
+        if inspect.iscoroutinefunction(getattr(Acquisition, name)):
+            async def call(*args):
+                return await asyncio.to_thread(self._call, name, *args)
+        else:
+            def call(*args):
+                return self._call(name, *args)
+        return call
+
+    def instance(self) -> str:
+        return self._instance
+
+    def snapshot(self) -> Snapshot:
+        with self._lock:
+            written = self._ring.written
+            if written != self._written:
+                record = self._ring.read()
+                if record is not None:
+                    self._snapshot = Snapshot.from_json(*record)
+                self._written = written
+            return self._snapshot
+
+    def _follow(self, publish: Callable[[Snapshot], None]) -> None:
+        sequence = self.snapshot().sequence
+        while not self._stop.wait(self._poll_interval):
+            try:
+                snapshot = self.snapshot()
+            except Exception as e:
+                print('Error: ', e)
+                continue
+            if snapshot.sequence != sequence:
+                sequence = snapshot.sequence
+                publish(snapshot)
+
+    def start(self, publish: Callable[[Snapshot], None] | None = None) -> None:
+        if publish is not None:
+            threading.Thread(target=self._follow, args=(publish,), daemon=True).start()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        with self._lock:
+            self._ring.close()
+
+
+def main() -> None:
+    config_path = Path(__file__).parent.parent / 'config/config.yaml'
+    AcquisitionDaemon(Acquisition(config_path), DaemonConfig.from_yaml(config_path)).run()
+
+
+if __name__ == '__main__':
+    main()
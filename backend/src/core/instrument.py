@@ -1,28 +1,247 @@
+import asyncio
+import queue
 import socket
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Callable
+from src.core.transport import Transport
+from src.utils.metrics import COMMAND_LATENCY, INSTRUMENT_ERRORS, INSTRUMENT_UP
 
 
 class Instrument(ABC):
-    def __init__(self, ip: str, port: int, buffer_size: int, timeout: float):
+    _max_pipeline = 16
+    _min_backoff = 0.5
+    _max_backoff = 30.0
+
+    def __init__(self, ip: str, port: int, buffer_size: int, timeout: float,
+                 transport: Callable[[], Transport] | None = None):
         self._ip = ip
         self._port = port
         self._buffer_size = buffer_size
         self._timeout = timeout
-        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._socket.connect((self._ip, self._port))
-        self._socket.settimeout(self._timeout)
+        self._name = f'{type(self).__name__}@{ip}:{port}'
+        self._recv_buffer = bytearray(buffer_size)
+        self._recv_view = memoryview(self._recv_buffer)
+        self._pending = bytearray()
+        self._transport = transport
+        self._socket = None
+        self._connect_lock = threading.Lock()
+        self._connections = 0
+        self._connected_at = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._last_error = None
+        self._up = INSTRUMENT_UP.labels(self._name)
+        self._commands = queue.Queue()
+        self._io_worker = threading.Thread(target=self._process_commands, daemon=True)
+        self._io_worker.start()
+
+    def _process_commands(self) -> None:
+        while True:
+            batch = []
+            item = self._commands.get()
+            while item is not None:
+                if item[3].set_running_or_notify_cancel():
+                    batch.append(item)
+                if len(batch) >= self._max_pipeline:
+                    break
+                try:
+                    item = self._commands.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._execute(batch)
+            if item is None:
+                return
+
+    def _handshake(self, first: bool) -> list[str]:
+        return []
+
+    def connect(self) -> None:
+        with self._connect_lock:
+            if self._socket is not None:
+                return
+            if time.monotonic() < self._retry_at:
+                raise ConnectionError(f'{self._name} is unavailable: {self._last_error}')
+            try:
+                if self._transport is not None:
+                    connection = self._transport()
+                else:
+                    connection = socket.create_connection((self._ip, self._port), timeout=self._timeout)
+                connection.sendall(''.join(command + '\n' for command in self._handshake(self._connections == 0))
+                                   .encode('UTF-8'))
+            except OSError as e:
+                INSTRUMENT_ERRORS.labels(self._name, 'connect').inc()
+                self._last_error = str(e) or type(e).__name__
+                self._backoff = min(max(self._backoff * 2, self._min_backoff), self._max_backoff)
+                self._retry_at = time.monotonic() + self._backoff
+                raise ConnectionError(f'Could not connect to {self._name}: {self._last_error}') from e
+            self._pending.clear()
+            self._socket = connection
+            self._connections += 1
+            self._connected_at = time.time()
+            self._backoff = 0.0
+            self._last_error = None
+            self._up.set(1)
+
+    def _disconnect(self, error: Exception, connection: Transport | None = None) -> None:
+        with self._connect_lock:
+            if self._socket is None or connection not in (None, self._socket):
+                return
+            self._socket.close()
+            self._socket = None
+            self._connected_at = None
+            self._last_error = str(error) or type(error).__name__
+            self._retry_at = time.monotonic() + self._min_backoff
+            self._backoff = self._min_backoff
+            self._up.set(0)
+
+    def _connection(self) -> Transport:
+        connection = self._socket
+        if connection is None:
+            self.connect()
+            connection = self._socket
+        return connection
+
+    @property
+    def retry_delay(self) -> float:
+        return max(self._retry_at - time.monotonic(), 0.0) or self._min_backoff
+
+    @property
+    def connected(self) -> bool:
+        return self._socket is not None
+
+    @property
+    def health(self) -> dict:
+        return {'name': self._name, 'connected': self._socket is not None, 'connected_at': self._connected_at,
+                'connections': self._connections, 'last_error': self._last_error,
+                'retry_in': None if self._socket is not None else max(self._retry_at - time.monotonic(), 0.0)}
+
+    def _execute(self, batch: list[tuple[bytes, str, Callable[[], str | bytes] | None, Future]]) -> None:
+        started = time.perf_counter()
+        try:
+            connection = self._connection()
+            try:
+                connection.sendall(b''.join(payload for payload, _, _, _ in batch))
+            except ConnectionError:
+                raise
+            except OSError as e:
+                raise ConnectionError(f'Could not send to {self._name}: {str(e) or type(e).__name__}') from e
+        except Exception as e:
+            INSTRUMENT_ERRORS.labels(self._name, 'send').inc()
+            self._disconnect(e)
+            for _, _, _, future in batch:
+                future.set_exception(e)
+            return
+        for i, (_, command, reader, future) in enumerate(batch):
+            if reader is None:
+                future.set_result(None)
+                continue
+            try:
+                reply = reader()
+            except ValueError as e:
+                INSTRUMENT_ERRORS.labels(self._name, 'parse').inc()
+                future.set_exception(e)
+                continue
+            except Exception as e:
+                INSTRUMENT_ERRORS.labels(self._name, 'receive').inc()
+                self._disconnect(e)
+                for _, _, _, failed in batch[i:]:
+                    failed.set_exception(e)
+                return
+            COMMAND_LATENCY.labels(self._name, command).observe(time.perf_counter() - started)
+            future.set_result(reply)
+
+    def _submit(self, command: str, expects_reply: bool, block: bool = False) -> Future:
+        future = Future()
+        reader = None if not expects_reply else self._read_block if block else self._read_reply
+        self._commands.put(((command + '\n').encode('UTF-8'), command.split(' ', 1)[0], reader, future))
+        return future
+
+    def _fill(self) -> None:
+        connection = self._connection()
+        try:
+            size = connection.recv_into(self._recv_buffer)
+            if size == 0:
+                raise ConnectionError(f'Connection closed by {self._ip}:{self._port}')
+        except ConnectionError as e:
+            self._disconnect(e, connection)
+            raise
+        except OSError as e:
+            self._disconnect(e, connection)
+            raise ConnectionError(f'No reply from {self._name}: {str(e) or type(e).__name__}') from e
+        self._pending += self._recv_view[:size]
+
+    def _read_line(self) -> str:
+        while (end := self._pending.find(b'\n')) == -1:
+            self._fill()
+        line = self._pending[:end].decode('UTF-8')
+        del self._pending[:end + 1]
+        return line.rstrip('\r')
+
+    def _read_reply(self) -> str:
+        return self._read_line().rstrip()
+
+    def _read_exactly(self, size: int) -> bytes:
+        while len(self._pending) < size:
+            self._fill()
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+    def _read_block(self) -> bytes:
+        header = self._read_exactly(2)
+        if header[:1] != b'#' or not header[1:].isdigit() or header[1:] == b'0':
+            line = self._read_line()
+            raise ValueError(f'Malformed block header: {header.decode("UTF-8", "replace")}{line}')
+        digits = int(header[1:])
+        payload = self._read_exactly(int(self._read_exactly(digits)))
+        self._read_line()
+        return payload
+
+    def _read_lines(self) -> list[str]:
+        while (end := self._pending.rfind(b'\n')) == -1:
+            self._fill()
+        lines = self._pending[:end].decode('UTF-8').split('\n')
+        del self._pending[:end + 1]
+        return [line.rstrip('\r') for line in lines]
 
     def _send_command(self, command: str) -> None:
-        command = command + '\n'
-        self._socket.sendall(command.encode('UTF-8'))
+        self._submit(command, False).result()
 
     def _send_and_receive_command(self, command: str) -> str:
-        command = command + '\n'
-        self._socket.sendall(command.encode('UTF-8'))
-        return self._socket.recv(self._buffer_size).decode('UTF-8').rstrip()
+        return self._submit(command, True).result()
+
+    def _send_and_receive_block(self, command: str) -> bytes:
+        return self._submit(command, True, block=True).result()
+
+    async def _send_command_async(self, command: str) -> None:
+        await asyncio.wrap_future(self._submit(command, False))
+
+    async def _send_and_receive_command_async(self, command: str) -> str:
+        return await asyncio.wrap_future(self._submit(command, True))
+
+    def _close(self) -> None:
+        self._commands.put(None)
+        self._io_worker.join(timeout=self._timeout)
+        with self._connect_lock:
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+            self._retry_at = float('inf')
+            self._up.set(0)
 
     def ping(self) -> str:
         return self._send_and_receive_command('*IDN?')
 
+    async def ping_async(self) -> str:
+        return await self._send_and_receive_command_async('*IDN?')
+
+    @property
+    def name(self) -> str:
+        return self._name
+
     @abstractmethod
     def shutdown(self): pass
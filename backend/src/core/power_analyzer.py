@@ -1,45 +1,139 @@
+import math
 import threading
 import time
+import numpy as np
+from typing import Callable
 from src.core.instrument import Instrument
+from src.core.sample import Sample
+from src.core.transport import Transport
+from src.utils.metrics import INSTRUMENT_ERRORS, SAMPLES, SAMPLE_RATE, TARGET_RATE, RateMeter
+from src.utils.ring_buffer import RingBuffer
+from src.utils.scheduler import Deadline
 
 
 class PowerAnalyzer(Instrument):
-    def __init__(self, ip: str, port: int, buffer_size: int, timeout: float, sampling_frequency: float):
-        super().__init__(ip, port, buffer_size, timeout)
+    _overrange = 9.9e37
+
+    def __init__(self, ip: str, port: int, buffer_size: int, timeout: float, sampling_frequency: float,
+                 history_size: int, channels: list[int], quantities: dict[str, str], mode: str = 'measure',
+                 sync: bool = False, transport: Callable[[], Transport] | None = None):
+        if mode not in ('measure', 'numeric'):
+            raise ValueError(f'Unknown power analyzer mode: {mode}')
+        super().__init__(ip, port, buffer_size, timeout, transport)
         self._sampling_frequency = sampling_frequency
-        self._latest_values = {}
+        self._boost = None
+        self._latest_values = None
+        self._sequence = 0
+        self._channels = list(channels)
+        self._labels = tuple(f'channel{channel}' for channel in self._channels)
+        self._fields = tuple(quantities)
+        self._items = tuple(quantities.values())
+        self._mode = mode
+        self._sync = sync and mode == 'numeric'
+        self._query = ';'.join(f':MEAS? {",".join(f"{item}{channel}" for channel in self._channels)}'
+                               for item in self._items)
+        self._history = {label: RingBuffer(history_size, self._fields) for label in self._labels}
+        self._listeners = []
+        self._sample_count = 0
+        self._sample_ready = threading.Condition()
+        self._samples = SAMPLES.labels(self._name)
+        self._rate = RateMeter(SAMPLE_RATE.labels(self._name))
+        TARGET_RATE.labels(self._name).set(sampling_frequency)
         self._stop = threading.Event()
-        self._worker = threading.Thread(target=self._update_values, args=([1, 2, 3, 4],), daemon=True)
+        self._worker = threading.Thread(target=self._update_values, daemon=True)
         self._worker.start()
 
-    def _update_values(self, channel: int | list) -> None:
-        while not self._stop.is_set():
-            if isinstance(channel, int):
-                command = f':MEAS? Urms{channel};:MEAS? Irms{channel}'
-                values = self._send_and_receive_command(command)
-                values = values.split(';')
-                values = {f'channel{channel}': {'voltage': float(values[0]), 'current': float(values[1])}}
-                self._latest_values = values
+    def _handshake(self, first: bool) -> list[str]:
+        if self._mode != 'numeric':
+            return []
+        commands = [':NUM:FORM FLO', f':NUM:NORM:NUM {len(self._channels) * len(self._items)}']
+        items = [(item, channel) for channel in self._channels for item in self._items]
+        commands += [f':NUM:NORM:ITEM{number} {item},{channel}' for number, (item, channel) in enumerate(items, 1)]
+        if self._sync:
+            commands.append(':STAT:FILT1 FALL')
+        return commands
+
+    def _update_values(self) -> None:
+        frequency = self._sampling_frequency
+        paced = not self._sync and not math.isinf(frequency)
+        deadline = Deadline(frequency, self._name) if paced else None
+        while deadline.wait(self._stop) if deadline is not None else not self._stop.is_set():
+            if deadline is not None and (self._boost or self._sampling_frequency) != frequency:
+                frequency = self._boost or self._sampling_frequency
+                deadline = Deadline(frequency, self._name)
+            try:
+                self._read_values()
+            except (ValueError, IndexError) as e:
+                INSTRUMENT_ERRORS.labels(self._name, 'parse').inc()
+                print('Error: ', e)
+            except Exception as e:
+                print('Error: ', e)
+                if not self.connected:
+                    self._stop.wait(self.retry_delay)
+
+    def _read_values(self) -> None:
+        requested = time.time()
+        if self._mode == 'numeric':
+            if self._sync:
+                self._submit(':COMM:WAIT 1', False)
+                block = self._submit(':NUM:NORM:VAL?', True, block=True)
+                self._submit(':STAT:EESR?', True)
+                data = block.result()
+                timestamp = time.time()
             else:
-                urms_fields = ",".join(f'Urms{ch}' for ch in channel)
-                irms_fields = ",".join(f'Irms{ch}' for ch in channel)
-                command = f':MEAS? {urms_fields};:MEAS? {irms_fields}'
-                values = self._send_and_receive_command(command)
-                parts = [p.strip() for p in values.strip().split(";") if p.strip()]
-                urms_list = [x for x in parts[0].split(',') if x]
-                irms_list = [x for x in parts[1].split(',') if x]
-                channel_values = {}
-                for ch, u, i in zip(channel, urms_list, irms_list):
-                    channel_values[f'channel{ch}'] = {'voltage': float(u), 'current': float(i)}
-                self._latest_values = channel_values
-            time.sleep(1 / self._sampling_frequency)
+                data = self._send_and_receive_block(':NUM:NORM:VAL?')
+                timestamp = (requested + time.time()) / 2
+            values = np.frombuffer(data, dtype='>f4').astype(np.float64)
+        else:
+            reply = self._send_and_receive_command(self._query)
+            timestamp = (requested + time.time()) / 2
+            values = np.array(reply.replace(';', ',').split(','), dtype=np.float64)
+            if values.size == len(self._items) * len(self._channels):
+                values = values.reshape(len(self._items), len(self._channels)).T.ravel()
+        values[np.abs(values) >= self._overrange] = np.nan
+        if values.size != len(self._items) * len(self._channels):
+            raise ValueError(f'Expected {len(self._items) * len(self._channels)} values, got {values.size}')
+        self._store(timestamp, tuple(values.tolist()))
+
+    def _store(self, timestamp: float, values: tuple[float, ...]) -> None:
+        self._sequence += 1
+        sample = Sample(timestamp, self._sequence, self._labels, self._fields, values)
+        width = len(self._fields)
+        for i, channel in enumerate(self._labels):
+            self._history[channel].append(timestamp, values[i * width:(i + 1) * width])
+        self._latest_values = sample
+        self._samples.inc()
+        self._rate.tick()
+        for listener in self._listeners:
+            listener(sample)
+        with self._sample_ready:
+            self._sample_count += 1
+            self._sample_ready.notify_all()
+
+    def wait_for_sample(self, timeout: float | None = None) -> bool:
+        with self._sample_ready:
+            count = self._sample_count
+            return self._sample_ready.wait_for(lambda: self._sample_count != count, timeout)
+
+    def boost(self, frequency: float | None) -> None:
+        self._boost = frequency
+        TARGET_RATE.labels(self._name).set(frequency or self._sampling_frequency)
+
+    def add_listener(self, listener: Callable[[Sample], None]) -> None:
+        self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener: Callable[[Sample], None]) -> None:
+        self._listeners = [existing for existing in self._listeners if existing != listener]
+
+    @property
+    def history(self) -> dict[str, RingBuffer]:
+        return self._history
 
     @property
-    def read(self) -> dict[str, dict[str, float]]:
-        copied_values = {k: v.copy() for k, v in self._latest_values.items()}
-        return copied_values
+    def read(self) -> Sample | None:
+        return self._latest_values
 
     def shutdown(self):
         self._stop.set()
         self._worker.join(timeout=self._timeout)
-        self._socket.close()
+        self._close()
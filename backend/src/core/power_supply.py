@@ -1,57 +1,181 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
 from src.core.instrument import Instrument
+from src.core.transport import Transport
 
 
 class PowerSupply(Instrument):
     def __init__(self, ip: str, port: int, buffer_size: int, timeout: float, max_voltage: float, max_current: float,
-                 max_power: float):
-        super().__init__(ip, port, buffer_size, timeout)
+                 max_power: float, cache_ttl: float, transport: Callable[[], Transport] | None = None):
+        super().__init__(ip, port, buffer_size, timeout, transport)
         self._max_voltage = max_voltage
         self._max_current = max_current
         self._max_power = max_power
+        self._cache_ttl = cache_ttl
+        self._voltage = 0.0
+        self._current = 0.0
         self._on = False
-        self._send_command('*CLS')
-        self._send_command('SYST:REM:CC eth')
-        self._send_command('SYST:REM:CV eth')
-        self._send_command('SYST:REM:CP eth')
-        self._send_command(f'SOUR:VOLT 0')
-        self._send_command(f'SOUR:CUR 0')
-        self._send_command(f'SOUR:POW {max_power}')
+        self._refreshed = 0.0
+        self._writes = 0
+        self._refreshing = None
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def _handshake(self, first: bool) -> list[str]:
+        self._refreshed = 0.0
+        commands = ['*CLS', 'SYST:REM:CC eth', 'SYST:REM:CV eth', 'SYST:REM:CP eth']
+        if first:
+            commands += ['SOUR:VOLT 0', 'SOUR:CUR 0']
+        return commands + [f'SOUR:POW {self._max_power}']
+
+    def _refresh(self) -> Future:
+        with self._lock:
+            if time.monotonic() - self._refreshed < self._cache_ttl:
+                future = Future()
+                future.set_result(None)
+                return future
+            if self._refreshing is not None:
+                return self._refreshing
+            refreshing = self._refreshing = Future()
+            writes = self._writes
+        reply = self._submit('SOUR:VOLT?;SOUR:CUR?;OUTP?', True)
+        reply.add_done_callback(lambda done: self._on_refresh(done, refreshing, writes))
+        return refreshing
+
+    def _on_refresh(self, reply: Future, refreshing: Future, writes: int) -> None:
+        with self._lock:
+            self._refreshing = None
+            try:
+                voltage, current, output = reply.result().split(';')
+                if writes == self._writes:
+                    self._voltage = float(voltage)
+                    self._current = float(current)
+                    self._on = output.strip() in ('1', 'ON')
+                    self._refreshed = time.monotonic()
+            except Exception as e:
+                refreshing.set_exception(e)
+                return
+        refreshing.set_result(None)
+
+    def _write(self, command: str, **state) -> Future:
+        with self._lock:
+            self._writes += 1
+            for name, value in state.items():
+                setattr(self, f'_{name}', value)
+        for listener in self._listeners:
+            listener(state)
+        return self._submit(command, False)
+
+    def validate(self, voltage: float | None = None, current: float | None = None) -> None:
+        if voltage is not None and not 0 <= voltage <= self._max_voltage:
+            raise ValueError(f'Voltage {voltage} outside 0..{self._max_voltage}')
+        if current is not None and not 0 <= current <= self._max_current:
+            raise ValueError(f'Current {current} outside 0..{self._max_current}')
+
+    def apply(self, voltage: float | None = None, current: float | None = None, on: bool | None = None) -> Future:
+        self.validate(voltage, current)
+        commands = []
+        state = {}
+        if voltage is not None:
+            commands.append(f'SOUR:VOLT {voltage}')
+            state['voltage'] = voltage
+        if current is not None:
+            commands.append(f'SOUR:CUR {current}')
+            state['current'] = current
+        if on is not None:
+            commands.append(f'OUTP {int(on)}')
+            state['on'] = on
+        if not commands:
+            future = Future()
+            future.set_result(None)
+            return future
+        return self._write(';'.join(commands), **state)
+
+    def add_listener(self, listener: Callable[[dict[str, float | bool]], None]) -> None:
+        self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener: Callable[[dict[str, float | bool]], None]) -> None:
+        self._listeners = [existing for existing in self._listeners if existing != listener]
+
+    @property
+    def max_voltage(self) -> float:
+        return self._max_voltage
+
+    @property
+    def max_current(self) -> float:
+        return self._max_current
 
     @property
-    def current(self) -> str:
-        return self._send_and_receive_command('SOUR:CUR?')
+    def current(self) -> float:
+        self._refresh().result()
+        return self._current
 
     @current.setter
     def current(self, current: float) -> None:
-        if 0 <= current <= self._max_current:
-            self._send_command(f'SOUR:CUR {current}')
+        self.validate(current=current)
+        self._write(f'SOUR:CUR {current}', current=current).result()
 
     @property
-    def voltage(self) -> str:
-        return self._send_and_receive_command('SOUR:VOLT?')
+    def voltage(self) -> float:
+        self._refresh().result()
+        return self._voltage
 
     @voltage.setter
     def voltage(self, voltage: float) -> None:
-        if 0 <= voltage <= self._max_voltage:
-            self._send_command(f'SOUR:VOLT {voltage}')
+        self.validate(voltage=voltage)
+        self._write(f'SOUR:VOLT {voltage}', voltage=voltage).result()
+
+    async def get_current(self) -> float:
+        await asyncio.wrap_future(self._refresh())
+        return self._current
+
+    async def set_current(self, current: float) -> None:
+        self.validate(current=current)
+        await asyncio.wrap_future(self._write(f'SOUR:CUR {current}', current=current))
+
+    async def get_voltage(self) -> float:
+        await asyncio.wrap_future(self._refresh())
+        return self._voltage
+
+    async def set_voltage(self, voltage: float) -> None:
+        self.validate(voltage=voltage)
+        await asyncio.wrap_future(self._write(f'SOUR:VOLT {voltage}', voltage=voltage))
 
     @property
     def on(self) -> bool:
+        self._refresh().result()
         return self._on
 
-    def on_off(self) -> bool:
-        if self._on:
-            self._send_command('OUTP 0')
-            self._on = False
-        else:
-            self._send_command('OUTP 1')
-            self._on = True
+    async def get_on(self) -> bool:
+        await asyncio.wrap_future(self._refresh())
         return self._on
 
+    def on_off(self) -> bool:
+        on = not self.on
+        self._write(f'OUTP {int(on)}', on=on).result()
+        return on
+
+    async def set_on(self, on: bool) -> None:
+        await asyncio.wrap_future(self._write(f'OUTP {int(on)}', on=on))
+
+    async def on_off_async(self) -> bool:
+        on = not await self.get_on()
+        await self.set_on(on)
+        return on
+
+    async def get_state(self) -> dict[str, float | bool]:
+        await asyncio.wrap_future(self._refresh())
+        return {'voltage': self._voltage, 'current': self._current, 'is_on': self._on}
+
     def shutdown(self) -> None:
-        self._send_command(f'SOUR:VOLT 0')
-        self._send_command(f'SOUR:CUR 0')
-        self._send_command('SYST:REM:CC front')
-        self._send_command('SYST:REM:CV front')
-        self._send_command('SYST:REM:CP front')
-        self._socket.close()
+        try:
+            self._send_command(f'SOUR:VOLT 0')
+            self._send_command(f'SOUR:CUR 0')
+            self._send_command('SYST:REM:CC front')
+            self._send_command('SYST:REM:CV front')
+            self._send_command('SYST:REM:CP front')
+        finally:
+            self._close()
@@ -0,0 +1,192 @@
+import datetime
+import json
+import queue
+import threading
+import time
+import numpy as np
+from pathlib import Path
+from src.core.sample import Sample
+
+HEADER_SIZE = 4096
+
+
+def read_header(path: Path) -> dict:
+    with open(path, 'rb') as stream:
+        return json.loads(stream.readline().decode('UTF-8'))
+
+
+def open_chunk(path: Path) -> np.memmap | np.ndarray:
+    header = read_header(path)
+    dtype = np.dtype([tuple(field) for field in header['dtype']])
+    header_size = header.get('header_size', HEADER_SIZE)
+    records = (path.stat().st_size - header_size) // dtype.itemsize
+    if records == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=header_size, shape=(records,))
+
+
+class ChunkWriter:
+    def __init__(self, directory: Path, stream: str, columns: list[tuple[str, str]], max_size: int,
+                 max_duration: float):
+        self._directory = directory
+        self._stream = stream
+        self._columns = columns
+        self._dtype = np.dtype([('time', '<f8')] + [(f'{channel}.{field}', '<f4') for channel, field in columns])
+        self._max_size = max_size
+        self._max_duration = max_duration
+        self._index = -1
+        self._file = None
+        self._size = 0
+        self._opened = 0.0
+        self._records = 0
+
+    def _roll(self) -> None:
+        self.close()
+        self._index += 1
+        path = self._directory / f'{self._stream}_{self._index:06d}.bin'
+        header = {'version': 2, 'stream': self._stream, 'chunk': self._index, 'created': time.time(),
+                  'dtype': [[name, self._dtype[name].str] for name in self._dtype.names], 'header_size': HEADER_SIZE}
+        encoded = json.dumps(header).encode('UTF-8')
+        while len(encoded) >= header['header_size']:
+            header['header_size'] += HEADER_SIZE
+            encoded = json.dumps(header).encode('UTF-8')
+        self._file = open(path, 'wb')
+        self._file.write(encoded.ljust(header['header_size'] - 1) + b'\n')
+        self._size = header['header_size']
+        self._opened = time.monotonic()
+
+    def write(self, samples: list[Sample]) -> None:
+        if (self._file is None or self._size >= self._max_size
+                or time.monotonic() - self._opened >= self._max_duration):
+            self._roll()
+        records = np.empty(len(samples), dtype=self._dtype)
+        records['time'] = [sample.time for sample in samples]
+        for channels in {sample.channels for sample in samples}:
+            rows = [i for i, sample in enumerate(samples) if sample.channels == channels]
+            values = np.array([samples[i].values for i in rows], dtype=np.float64)
+            layout = samples[rows[0]]
+            for channel, field in self._columns:
+                name = f'{channel}.{field}'
+                records[name][rows] = values[:, layout.index(channel, field)] if channel in channels else np.nan
+        data = records.tobytes()
+        self._file.write(data)
+        self._size += len(data)
+        self._records += len(samples)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def records(self) -> int:
+        return self._records
+
+    @property
+    def chunks(self) -> int:
+        return self._index + 1
+
+
+class Recorder:
+    _batch_size = 4096
+
+    def __init__(self, path: Path, streams: dict[str, list[tuple[str, str]]], max_chunk_size: int,
+                 max_chunk_duration: float, flush_interval: float, queue_size: int):
+        self._path = path
+        self._streams = streams
+        self._max_chunk_size = max_chunk_size
+        self._max_chunk_duration = max_chunk_duration
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._recording = False
+        self._session = None
+        self._writers = {}
+        self._dropped = 0
+        self._started = 0.0
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def write(self, stream: str, sample: Sample) -> None:
+        if not self._recording:
+            return
+        try:
+            self._queue.put_nowait((stream, sample))
+        except queue.Full:
+            self._dropped += 1
+
+    def _run(self) -> None:
+        flushed = time.monotonic()
+        running = True
+        while running:
+            items = []
+            try:
+                items.append(self._queue.get(timeout=self._flush_interval))
+                while len(items) < self._batch_size:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            batches = {}
+            for item in items:
+                if item is None:
+                    running = False
+                    break
+                stream, sample = item
+                batches.setdefault(stream, []).append(sample)
+            for stream, samples in batches.items():
+                self._writers[stream].write(samples)
+            if not running or time.monotonic() - flushed >= self._flush_interval:
+                for writer in self._writers.values():
+                    writer.flush()
+                flushed = time.monotonic()
+        for writer in self._writers.values():
+            writer.close()
+
+    def start(self, name: str | None = None) -> dict:
+        with self._lock:
+            if self._recording:
+                raise RuntimeError('Recorder is already running')
+            stamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+            self._session = self._path / (f'session_{stamp}_{name}' if name else f'session_{stamp}')
+            self._session.mkdir(parents=True, exist_ok=False)
+            self._writers = {stream: ChunkWriter(self._session, stream, columns, self._max_chunk_size,
+                                                 self._max_chunk_duration)
+                             for stream, columns in self._streams.items()}
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._dropped = 0
+            self._started = time.time()
+            self._write_metadata(None)
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+            self._recording = True
+            return self.status
+
+    def stop(self) -> dict:
+        with self._lock:
+            if not self._recording:
+                raise RuntimeError('Recorder is not running')
+            self._recording = False
+            self._queue.put(None)
+            self._worker.join()
+            self._write_metadata(time.time())
+            return self.status
+
+    def _write_metadata(self, stopped: float | None) -> None:
+        metadata = {'name': self._session.name, 'started': self._started, 'stopped': stopped,
+                    'streams': {stream: ['time'] + [f'{channel}.{field}' for channel, field in columns]
+                                for stream, columns in self._streams.items()}}
+        with open(self._session / 'session.json', 'w', encoding='utf-8') as stream:
+            json.dump(metadata, stream, indent=2)
+
+    @property
+    def status(self) -> dict:
+        return {'recording': self._recording,
+                'session': self._session.name if self._session is not None else None,
+                'started': self._started,
+                'records': {stream: writer.records for stream, writer in self._writers.items()},
+                'chunks': {stream: writer.chunks for stream, writer in self._writers.items()},
+                'queued': self._queue.qsize(),
+                'dropped': self._dropped}
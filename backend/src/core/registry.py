@@ -0,0 +1,96 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+from src.core.arduino import Arduino
+from src.core.instrument import Instrument
+from src.core.power_analyzer import PowerAnalyzer
+from src.core.power_supply import PowerSupply
+from src.core.transport import TraceRecorder, TraceReplay
+from src.utils.config import PowerSupplyConfig, PowerAnalyzerConfig, ArduinoConfig
+
+
+class InstrumentRegistry:
+    def __init__(self, power_supplies: dict[str, PowerSupply], power_analyzers: dict[str, PowerAnalyzer],
+                 arduinos: dict[str, Arduino]):
+        self._power_supplies = power_supplies
+        self._power_analyzers = power_analyzers
+        self._arduinos = arduinos
+
+    @classmethod
+    def from_config(cls, psu_config: PowerSupplyConfig, pwa_config: PowerAnalyzerConfig,
+                    arduino_config: ArduinoConfig, calibration: dict,
+                    addresses: dict[str, list[tuple[str, int]]] | None = None,
+                    trace: TraceRecorder | TraceReplay | None = None) -> 'InstrumentRegistry':
+        if addresses is None:
+            addresses = {'power_supply': [(ip, psu_config.port) for ip in psu_config.ip],
+                         'power_analyzer': [(ip, pwa_config.port) for ip in pwa_config.ip],
+                         'arduino': [(ip, arduino_config.port) for ip in arduino_config.ip]}
+
+        def transport(kind: str, instrument_id: str, address: tuple[str, int], timeout: float):
+            return trace.opener(f'{kind}/{instrument_id}', address, timeout) if trace is not None else None
+
+        power_supplies = {
+            psu_id: PowerSupply(*address, psu_config.buffer_size, psu_config.timeout, psu_config.max_voltage,
+                                psu_config.max_current, psu_config.max_power, psu_config.cache_ttl,
+                                transport('power_supply', psu_id, address, psu_config.timeout))
+            for psu_id, address in zip(psu_config.ids, addresses['power_supply'])}
+        sampling_frequency = pwa_config.sampling_frequency
+        if isinstance(trace, TraceReplay):
+            sampling_frequency = sampling_frequency * trace.speed if trace.speed > 0 else math.inf
+        power_analyzers = {
+            pwa_id: PowerAnalyzer(*address, pwa_config.buffer_size, pwa_config.timeout,
+                                  sampling_frequency, pwa_config.history_size, pwa_config.channels,
+                                  pwa_config.quantities, pwa_config.mode, pwa_config.sync,
+                                  transport('power_analyzer', pwa_id, address, pwa_config.timeout))
+            for pwa_id, address in zip(pwa_config.ids, addresses['power_analyzer'])}
+        arduinos = {
+            arduino_id: Arduino(*address, arduino_config.buffer_size, arduino_config.timeout,
+                                arduino_config.sampling_frequency, calibration.get(arduino_id, calibration),
+                                arduino_config.history_size, arduino_config.filters,
+                                transport('arduino', arduino_id, address, arduino_config.timeout))
+            for arduino_id, address in zip(arduino_config.ids, addresses['arduino'])}
+        return cls(power_supplies, power_analyzers, arduinos)
+
+    @property
+    def _all(self) -> list[Instrument]:
+        return [*self._power_supplies.values(), *self._power_analyzers.values(), *self._arduinos.values()]
+
+    @staticmethod
+    def _connect(instrument: Instrument) -> None:
+        try:
+            instrument.connect()
+        except ConnectionError as e:
+            print('Error: ', e)
+
+    def connect(self) -> dict[str, dict[str, dict]]:
+        instruments = self._all
+        with ThreadPoolExecutor(max_workers=len(instruments)) as executor:
+            list(executor.map(self._connect, instruments))
+        return self.health
+
+    @property
+    def health(self) -> dict[str, dict[str, dict]]:
+        return {'power_supply': {name: psu.health for name, psu in self._power_supplies.items()},
+                'power_analyzer': {name: pwa.health for name, pwa in self._power_analyzers.items()},
+                'arduino': {name: arduino.health for name, arduino in self._arduinos.items()}}
+
+    def power_supply(self, psu_id: str) -> PowerSupply:
+        return self._power_supplies[psu_id]
+
+    @property
+    def power_supplies(self) -> dict[str, PowerSupply]:
+        return self._power_supplies
+
+    @property
+    def power_analyzers(self) -> dict[str, PowerAnalyzer]:
+        return self._power_analyzers
+
+    @property
+    def arduinos(self) -> dict[str, Arduino]:
+        return self._arduinos
+
+    def shutdown(self) -> None:
+        for instrument in self._all:
+            try:
+                instrument.shutdown()
+            except Exception as e:
+                print('Error: ', e)
@@ -0,0 +1,27 @@
+import math
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class Sample:
+    time: float
+    sequence: int
+    channels: tuple[str, ...]
+    fields: tuple[str, ...]
+    values: tuple[float, ...]
+
+    def index(self, channel: str, field: str) -> int:
+        return self.channels.index(channel) * len(self.fields) + self.fields.index(field)
+
+    def get(self, channel: str, field: str) -> float:
+        return self.values[self.index(channel, field)]
+
+    def reading(self, channel: str) -> tuple[float, ...]:
+        start = self.channels.index(channel) * len(self.fields)
+        return self.values[start:start + len(self.fields)]
+
+    def to_dict(self) -> dict[str, dict[str, float | None]]:
+        width = len(self.fields)
+        return {channel: {field: None if math.isnan(value) else value
+                          for field, value in zip(self.fields, self.values[i * width:(i + 1) * width])}
+                for i, channel in enumerate(self.channels)}
@@ -0,0 +1,112 @@
+import io
+import json
+import threading
+import numpy as np
+from numpy.lib.recfunctions import repack_fields
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+from src.core.recorder import open_chunk
+
+
+@dataclass
+class ChunkIndex:
+    path: Path
+    size: int
+    first: float
+    last: float
+    records: int
+
+
+class SessionStore:
+    def __init__(self, path: Path, block_size: int = 65536):
+        self._path = path
+        self._block_size = block_size
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def _session(self, name: str) -> Path:
+        session = self._path / name
+        if name in ('.', '..') or session.parent != self._path or not (session / 'session.json').is_file():
+            raise KeyError(name)
+        return session
+
+    def list_sessions(self) -> list[dict]:
+        if not self._path.is_dir():
+            return []
+        sessions = []
+        for metadata in sorted(self._path.glob('*/session.json')):
+            with open(metadata, encoding='utf-8') as stream:
+                sessions.append(json.load(stream))
+        return sessions
+
+    def metadata(self, name: str) -> dict:
+        with open(self._session(name) / 'session.json', encoding='utf-8') as stream:
+            metadata = json.load(stream)
+        metadata['chunks'] = {stream: [{'file': chunk.path.name, 'first': chunk.first, 'last': chunk.last,
+                                        'records': chunk.records} for chunk in self.index(name, stream)]
+                              for stream in metadata['streams']}
+        return metadata
+
+    def index(self, name: str, stream: str) -> list[ChunkIndex]:
+        chunks = []
+        for path in sorted(self._session(name).glob(f'{stream}_[0-9]*.bin')):
+            size = path.stat().st_size
+            with self._lock:
+                chunk = self._index.get(path)
+            if chunk is None or chunk.size != size:
+                records = open_chunk(path)
+                if len(records) == 0:
+                    continue
+                chunk = ChunkIndex(path, size, float(records['time'][0]), float(records['time'][-1]), len(records))
+                with self._lock:
+                    self._index[path] = chunk
+            chunks.append(chunk)
+        return chunks
+
+    def query(self, name: str, stream: str, columns: list[str] | None = None, start: float | None = None,
+              end: float | None = None, decimate: int = 1) -> Iterator[np.ndarray]:
+        chunks = self.index(name, stream)
+        if not chunks:
+            return
+        first = 0 if start is None else np.searchsorted([chunk.last for chunk in chunks], start, side='left')
+        taken = 0
+        for chunk in chunks[first:]:
+            if end is not None and chunk.first > end:
+                break
+            records = open_chunk(chunk.path)[:chunk.records]
+            times = records['time']
+            low = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+            high = len(records) if end is None else int(np.searchsorted(times, end, side='right'))
+            for block_start in range(low, high, self._block_size):
+                block = records[block_start:min(block_start + self._block_size, high)]
+                offset = -taken % decimate
+                taken += len(block)
+                block = block[offset::decimate]
+                if columns is not None:
+                    block = repack_fields(block[['time'] + columns])
+                yield np.ascontiguousarray(block)
+
+    def export_csv(self, name: str, stream: str, columns: list[str] | None = None, start: float | None = None,
+                   end: float | None = None, decimate: int = 1) -> Iterator[bytes]:
+        names = self.dtype(name, stream, columns).names
+        yield (','.join(names) + '\n').encode('UTF-8')
+        for block in self.query(name, stream, columns, start, end, decimate):
+            buffer = io.StringIO()
+            values = np.column_stack([block[column].astype(np.float64) for column in block.dtype.names])
+            np.savetxt(buffer, values, delimiter=',', fmt=['%.6f'] + ['%.7g'] * (len(names) - 1))
+            yield buffer.getvalue().encode('UTF-8')
+
+    def export_binary(self, name: str, stream: str, columns: list[str] | None = None, start: float | None = None,
+                      end: float | None = None, decimate: int = 1) -> Iterator[bytes]:
+        for block in self.query(name, stream, columns, start, end, decimate):
+            yield block.tobytes()
+
+    def dtype(self, name: str, stream: str, columns: list[str] | None = None) -> np.dtype:
+        chunks = self.index(name, stream)
+        if not chunks:
+            raise KeyError(stream)
+        dtype = open_chunk(chunks[0].path).dtype
+        if columns is None:
+            return dtype
+        return np.dtype([('time', dtype['time'])] + [(column, dtype[column]) for column in columns])
@@ -0,0 +1,110 @@
+import math
+import threading
+from collections import deque
+from src.core.sample import Sample
+from src.utils.metrics import GLITCHES
+
+
+class RollingWindow:
+    def __init__(self, duration: float, width: int):
+        self._duration = duration
+        self._samples = deque()
+        self._count = [0] * width
+        self._mean = [0.0] * width
+        self._m2 = [0.0] * width
+        self._min = [deque() for _ in range(width)]
+        self._max = [deque() for _ in range(width)]
+
+    def add(self, sample: Sample) -> None:
+        self.expire(sample.time)
+        self._samples.append(sample)
+        for i, value in enumerate(sample.values):
+            if math.isnan(value):
+                continue
+            self._count[i] += 1
+            delta = value - self._mean[i]
+            self._mean[i] += delta / self._count[i]
+            self._m2[i] += delta * (value - self._mean[i])
+            lowest = self._min[i]
+            while lowest and lowest[-1][1] >= value:
+                lowest.pop()
+            lowest.append((sample.sequence, value))
+            highest = self._max[i]
+            while highest and highest[-1][1] <= value:
+                highest.pop()
+            highest.append((sample.sequence, value))
+
+    def _remove(self, sample: Sample) -> None:
+        for i, value in enumerate(sample.values):
+            if math.isnan(value):
+                continue
+            self._count[i] -= 1
+            if self._count[i] == 0:
+                self._mean[i] = self._m2[i] = 0.0
+            else:
+                delta = value - self._mean[i]
+                self._mean[i] -= delta / self._count[i]
+                self._m2[i] = max(self._m2[i] - delta * (value - self._mean[i]), 0.0)
+            if self._min[i] and self._min[i][0][0] == sample.sequence:
+                self._min[i].popleft()
+            if self._max[i] and self._max[i][0][0] == sample.sequence:
+                self._max[i].popleft()
+
+    def expire(self, now: float) -> None:
+        start = now - self._duration
+        while self._samples and self._samples[0].time < start:
+            self._remove(self._samples.popleft())
+
+    def summary(self, index: int) -> dict[str, float | int | None]:
+        count = self._count[index]
+        if count == 0:
+            return {'count': 0, 'mean': None, 'rms': None, 'std': None, 'min': None, 'max': None}
+        mean = self._mean[index]
+        variance = self._m2[index] / count
+        return {'count': count, 'mean': mean, 'rms': math.sqrt(variance + mean * mean), 'std': math.sqrt(variance),
+                'min': self._min[index][0][1], 'max': self._max[index][0][1]}
+
+
+class RollingStats:
+    def __init__(self, name: str, windows: list[float], limits: dict[str, float]):
+        self._windows = {f'{window:g}s': window for window in windows}
+        self._limits = limits
+        self._glitches = GLITCHES.labels(name)
+        self._lock = threading.Lock()
+        self._layout = None
+        self._checks = []
+        self._rolling = {}
+        self._latest = None
+
+    def _reset(self, sample: Sample) -> None:
+        self._layout = (sample.channels, sample.fields)
+        self._checks = [(sample.index(channel, field), limit) for field, limit in self._limits.items()
+                        if field in sample.fields for channel in sample.channels]
+        self._rolling = {key: RollingWindow(window, len(sample.values)) for key, window in self._windows.items()}
+
+    def update(self, sample: Sample) -> None:
+        with self._lock:
+            if self._layout != (sample.channels, sample.fields):
+                self._reset(sample)
+            if any(abs(sample.values[index]) > limit for index, limit in self._checks):
+                self._glitches.inc()
+                return
+            for rolling in self._rolling.values():
+                rolling.add(sample)
+            self._latest = sample
+
+    @property
+    def latest(self) -> Sample | None:
+        return self._latest
+
+    def summary(self, now: float) -> dict[str, dict[str, dict[str, dict]]]:
+        with self._lock:
+            if self._layout is None:
+                return {}
+            channels, fields = self._layout
+            for rolling in self._rolling.values():
+                rolling.expire(now)
+            return {channel: {field: {key: rolling.summary(i * len(fields) + j)
+                                      for key, rolling in self._rolling.items()}
+                              for j, field in enumerate(fields)}
+                    for i, channel in enumerate(channels)}
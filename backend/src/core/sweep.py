@@ -0,0 +1,147 @@
+import math
+import time
+import numpy as np
+from src.core.registry import InstrumentRegistry
+from src.utils.job import Job
+from src.utils.scheduler import Deadline
+
+
+def _summary(values: np.ndarray) -> dict[str, float | int | None]:
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None}
+    return {'count': int(len(values)), 'mean': float(values.mean()), 'std': float(values.std()),
+            'min': float(values.min()), 'max': float(values.max())}
+
+
+class Sweep:
+    def __init__(self, instruments: InstrumentRegistry, steps: list[dict], repeat: int = 1, ramp_rate: float = 10.0,
+                 settle: dict | None = None):
+        if not steps:
+            raise ValueError('A sweep needs at least one step')
+        if repeat < 1 or ramp_rate <= 0:
+            raise ValueError('repeat must be at least 1 and ramp_rate positive')
+        self._supplies = {}
+        for step in steps:
+            if step['ramp'] < 0 or step['dwell'] < 0:
+                raise ValueError('ramp and dwell must not be negative')
+            for setpoint in step['setpoints']:
+                try:
+                    psu = instruments.power_supply(setpoint['id'])
+                except KeyError:
+                    raise ValueError(f'Unknown power supply: {setpoint["id"]}')
+                for quantity, limit in (('voltage', psu.max_voltage), ('current', psu.max_current)):
+                    value = setpoint.get(quantity)
+                    if value is not None and not 0 <= value <= limit:
+                        raise ValueError(f'{setpoint["id"]} {quantity} {value} outside 0..{limit}')
+                self._supplies[setpoint['id']] = psu
+        self._histories = {name: instrument.history for name, instrument in
+                           {**instruments.power_analyzers, **instruments.arduinos}.items()}
+        self._settle = []
+        if settle is not None:
+            for channel in settle['channels']:
+                instrument, _, name = channel.partition('.')
+                history = self._histories.get(instrument, {}).get(name)
+                if history is None:
+                    raise ValueError(f'Unknown channel: {channel}')
+                if settle['field'] not in history.fields:
+                    raise ValueError(f'Unknown field: {settle["field"]}')
+                self._settle.append((channel, history, history.fields.index(settle['field'])))
+        self._settle_config = settle
+        self._steps = steps
+        self._repeat = repeat
+        self._ramp_rate = ramp_rate
+
+    def _write(self, setpoints: dict[str, dict[str, float | bool | None]]) -> None:
+        futures = [self._supplies[psu_id].apply(**setpoint) for psu_id, setpoint in setpoints.items()]
+        for future in futures:
+            future.result()
+
+    def _ramp(self, job: Job, step: dict, state: dict[str, dict[str, float]]) -> None:
+        targets = {setpoint['id']: setpoint for setpoint in step['setpoints']}
+        ticks = math.ceil(step['ramp'] * self._ramp_rate)
+        deadline = Deadline(self._ramp_rate, 'sweep')
+        for tick in range(1, ticks):
+            deadline.wait()
+            job.check()
+            self._write({psu_id: {quantity: state[psu_id][quantity]
+                                  + (target[quantity] - state[psu_id][quantity]) * tick / ticks
+                                  for quantity in ('voltage', 'current') if target.get(quantity) is not None}
+                         for psu_id, target in targets.items()})
+        if ticks:
+            deadline.wait()
+            job.check()
+        self._write({psu_id: {quantity: target.get(quantity) for quantity in ('voltage', 'current', 'on')}
+                     for psu_id, target in targets.items()})
+        for psu_id, target in targets.items():
+            state[psu_id].update({quantity: target[quantity] for quantity in ('voltage', 'current')
+                                  if target.get(quantity) is not None})
+
+    def _settled(self, written: float) -> bool:
+        window = self._settle_config['window']
+        start = time.time() - window
+        if start < written:
+            return False
+        for _, history, column in self._settle:
+            times, values = history.since(start)
+            values = values[:, column]
+            values = values[~np.isnan(values)]
+            if len(values) < 2 or values.max() - values.min() > self._settle_config['tolerance']:
+                return False
+        return True
+
+    def _wait_settled(self, job: Job, written: float) -> float | None:
+        if not self._settle:
+            return 0.0
+        started = time.monotonic()
+        timeout = self._settle_config['timeout']
+        poll = self._settle_config['window'] / 10
+        while time.monotonic() - started < timeout:
+            if self._settled(written):
+                return time.monotonic() - started
+            job.sleep(poll)
+        return None
+
+    def _readings(self, start: float, end: float) -> dict[str, dict[str, dict[str, dict]]]:
+        readings = {}
+        for name, histories in self._histories.items():
+            readings[name] = {}
+            for channel, history in histories.items():
+                times, values = history.since(start)
+                values = values[times <= end]
+                readings[name][channel] = {field: _summary(values[:, i]) for i, field in enumerate(history.fields)}
+        return readings
+
+    def run(self, job: Job) -> dict:
+        total = len(self._steps) * self._repeat
+        state = {psu_id: {'voltage': psu.voltage, 'current': psu.current} for psu_id, psu in self._supplies.items()}
+        started = time.monotonic()
+        completed = 0
+        unsettled = 0
+        try:
+            for repeat in range(self._repeat):
+                for index, step in enumerate(self._steps):
+                    job.check()
+                    job.update(step=completed + 1, steps=total, repeat=repeat + 1, phase='ramp')
+                    self._ramp(job, step, state)
+                    written = time.time()
+                    job.update(phase='settle')
+                    settle_time = self._wait_settled(job, written)
+                    unsettled += settle_time is None
+                    job.update(phase='dwell')
+                    dwell_start = time.time()
+                    job.sleep(step['dwell'])
+                    dwell_end = time.time()
+                    completed += 1
+                    job.emit({'step': completed, 'index': index, 'repeat': repeat + 1,
+                              'setpoints': step['setpoints'], 'settled': settle_time is not None,
+                              'settle_time': settle_time, 'start': dwell_start, 'end': dwell_end,
+                              'readings': self._readings(dwell_start, dwell_end)})
+                    job.update(completed=completed, eta=(time.monotonic() - started) / completed * (total - completed))
+        finally:
+            for psu_id, psu in self._supplies.items():
+                try:
+                    psu.apply(voltage=0, current=0, on=False).result()
+                except Exception as e:
+                    print('Error: ', e)
+        return {'steps': completed, 'unsettled': unsettled, 'duration': time.monotonic() - started}
@@ -0,0 +1,208 @@
+import socket
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Protocol
+
+MAGIC = b'VPTRACE\x01'
+RECORD = struct.Struct('<dBHI')
+STREAM, CONNECT, SENT, RECEIVED, CLOSED = range(5)
+
+
+class Transport(Protocol):
+    def sendall(self, data: bytes) -> None: ...
+
+    def recv_into(self, buffer: bytearray | memoryview) -> int: ...
+
+    def close(self) -> None: ...
+
+
+class RecordingTransport:
+    def __init__(self, connection: socket.socket, recorder: 'TraceRecorder', stream: int):
+        self._connection = connection
+        self._recorder = recorder
+        self._stream = stream
+        self._closed = False
+
+    def sendall(self, data: bytes) -> None:
+        self._recorder.write(self._stream, SENT, data)
+        self._connection.sendall(data)
+
+    def recv_into(self, buffer: bytearray | memoryview) -> int:
+        size = self._connection.recv_into(buffer)
+        if size:
+            self._recorder.write(self._stream, RECEIVED, buffer[:size])
+        return size
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._recorder.write(self._stream, CLOSED, b'')
+        self._connection.close()
+
+
+class TraceRecorder:
+    _flush_interval = 1.0
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._path = path
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._flushed = self._start
+        self._streams = {}
+
+    def write(self, stream: int, kind: int, payload: bytes | memoryview) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            now = time.monotonic()
+            self._file.write(RECORD.pack(now - self._start, kind, stream, len(payload)))
+            self._file.write(payload)
+            if now - self._flushed >= self._flush_interval:
+                self._file.flush()
+                self._flushed = now
+
+    def _stream(self, name: str) -> int:
+        with self._lock:
+            stream = self._streams.get(name)
+            if stream is None:
+                stream = self._streams[name] = len(self._streams)
+                self._file.write(RECORD.pack(time.monotonic() - self._start, STREAM, stream, len(name.encode())))
+                self._file.write(name.encode())
+        return stream
+
+    def opener(self, name: str, address: tuple[str, int], timeout: float) -> Callable[[], Transport]:
+        stream = self._stream(name)
+
+        def open_transport() -> Transport:
+            connection = socket.create_connection(address, timeout=timeout)
+            self.write(stream, CONNECT, f'{address[0]}:{address[1]}'.encode())
+            return RecordingTransport(connection, self, stream)
+
+        return open_transport
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+
+def read_trace(path: Path) -> dict[str, list[list[tuple[float, int, bytes]]]]:
+    with open(path, 'rb') as stream:
+        data = stream.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f'Not a trace file: {path}')
+    names = {}
+    sessions = {}
+    offset = len(MAGIC)
+    while offset + RECORD.size <= len(data):
+        timestamp, kind, stream_id, size = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        payload = data[offset:offset + size]
+        offset += size
+        if kind == STREAM:
+            names[stream_id] = payload.decode()
+            sessions[names[stream_id]] = []
+        elif kind == CONNECT:
+            sessions[names[stream_id]].append([(timestamp, kind, payload)])
+        elif sessions[names[stream_id]]:
+            sessions[names[stream_id]][-1].append((timestamp, kind, payload))
+    return sessions
+
+
+class ReplayTransport:
+    def __init__(self, events: list[tuple[float, int, bytes]], speed: float, timeout: float):
+        self._events = []
+        origin = events[0][0]
+        sent = 0
+        expected = []
+        for timestamp, kind, payload in events[1:]:
+            if kind == SENT:
+                sent += len(payload)
+                expected.append(payload)
+            elif kind == RECEIVED:
+                self._events.append((timestamp - origin, sent, payload))
+            elif kind == CLOSED:
+                break
+        self._expected = b''.join(expected)
+        self._speed = speed
+        self._timeout = timeout
+        self._started = time.monotonic()
+        self._sent = 0
+        self._index = 0
+        self._offset = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def sendall(self, data: bytes) -> None:
+        with self._condition:
+            if self._closed:
+                raise OSError('Replay transport is closed')
+            recorded = self._expected[self._sent:self._sent + len(data)]
+            if recorded != data:
+                self._closed = True
+                self._condition.notify_all()
+                raise ConnectionError(f'Replay diverged from the recording: sent {bytes(data)[:64]!r}, '
+                                      f'recorded {recorded[:64]!r}')
+            self._sent += len(data)
+            self._condition.notify_all()
+
+    def recv_into(self, buffer: bytearray | memoryview) -> int:
+        if self._index >= len(self._events):
+            return 0
+        timestamp, required, payload = self._events[self._index]
+        if self._offset == 0:
+            with self._condition:
+                if not self._condition.wait_for(lambda: self._sent >= required or self._closed, self._timeout):
+                    raise ConnectionError('Replay is waiting for a command that was never sent')
+                if self._closed:
+                    raise OSError('Replay transport is closed')
+            if self._speed > 0:
+                delay = self._started + timestamp / self._speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        size = min(len(buffer), len(payload) - self._offset)
+        buffer[:size] = payload[self._offset:self._offset + size]
+        self._offset += size
+        if self._offset == len(payload):
+            self._index += 1
+            self._offset = 0
+        return size
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class TraceReplay:
+    def __init__(self, path: Path, speed: float):
+        self._sessions = read_trace(path)
+        self._speed = speed
+        self._lock = threading.Lock()
+
+    def opener(self, name: str, address: tuple[str, int], timeout: float) -> Callable[[], Transport]:
+        sessions = list(self._sessions.get(name, []))
+
+        def open_transport() -> Transport:
+            with self._lock:
+                if not sessions:
+                    raise ConnectionRefusedError(f'No more recorded connections for {name}')
+                events = sessions.pop(0)
+            return ReplayTransport(events, self._speed, timeout)
+
+        return open_transport
+
+    def close(self) -> None:
+        pass
+
+    @property
+    def speed(self) -> float:
+        return self._speed
@@ -0,0 +1,258 @@
+import asyncio
+import random
+import re
+import struct
+import threading
+import time
+from pathlib import Path
+from src.utils.config import SimulationConfig, PowerSupplyConfig, PowerAnalyzerConfig, ArduinoConfig
+
+
+class Rig:
+    def __init__(self, power_supplies: int, sensor_k: float, sensor_m: float, noise: float):
+        self.power_supplies = [{'voltage': 0.0, 'current': 0.0, 'on': False} for _ in range(power_supplies)]
+        self.sensor_k = sensor_k
+        self.sensor_m = sensor_m
+        self.noise = noise
+
+    def current(self, channel: int) -> float:
+        if channel <= len(self.power_supplies) and self.power_supplies[channel - 1]['on']:
+            return self.power_supplies[channel - 1]['current'] + random.gauss(0, self.noise)
+        return abs(random.gauss(0, self.noise))
+
+    def voltage(self, channel: int) -> float:
+        if channel <= len(self.power_supplies) and self.power_supplies[channel - 1]['on']:
+            return self.power_supplies[channel - 1]['voltage'] + random.gauss(0, self.noise)
+        return abs(random.gauss(0, self.noise))
+
+
+class SimulatedInstrument:
+    def __init__(self, rig: Rig, config: SimulationConfig):
+        self._rig = rig
+        self._config = config
+
+    async def _delay(self) -> None:
+        delay = random.gauss(self._config.latency, self._config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _fault(self) -> bool:
+        return random.random() < self._config.fault_rate
+
+    def _drop(self) -> bool:
+        return random.random() < self._config.drop_rate
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                reply = await self._respond(line.decode('UTF-8').strip(), writer)
+                if reply is None or self._drop():
+                    continue
+                await self._delay()
+                if self._fault():
+                    writer.write(b'#garbage\n')
+                else:
+                    writer.write((reply if isinstance(reply, bytes) else reply.encode('UTF-8')) + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, line: str, writer: asyncio.StreamWriter) -> str | bytes | None:
+        if line == '*IDN?':
+            return f'SIMULATED,{type(self).__name__},0,1.0'
+        return None
+
+
+class PowerSupplySimulator(SimulatedInstrument):
+    def __init__(self, rig: Rig, config: SimulationConfig, index: int):
+        super().__init__(rig, config)
+        self._state = rig.power_supplies[index]
+
+    async def _respond(self, line: str, writer: asyncio.StreamWriter) -> str | None:
+        replies = []
+        for command in line.split(';'):
+            command = command.strip()
+            name, _, argument = command.partition(' ')
+            if command == 'SOUR:VOLT?':
+                replies.append(f"{self._state['voltage']:.3f}")
+            elif command == 'SOUR:CUR?':
+                replies.append(f"{self._state['current']:.3f}")
+            elif command == 'OUTP?':
+                replies.append('1' if self._state['on'] else '0')
+            elif command == '*IDN?':
+                replies.append(await super()._respond(command, writer))
+            elif name == 'SOUR:VOLT':
+                self._state['voltage'] = float(argument)
+            elif name == 'SOUR:CUR':
+                self._state['current'] = float(argument)
+            elif name == 'OUTP':
+                self._state['on'] = argument.strip() in ('1', 'ON')
+        return ';'.join(replies) if replies else None
+
+
+class PowerAnalyzerSimulator(SimulatedInstrument):
+    def __init__(self, rig: Rig, config: SimulationConfig):
+        super().__init__(rig, config)
+        self._binary = False
+        self._items = {}
+        self._count = 0
+        self._started = time.monotonic()
+        self._update = 0
+
+    def _value(self, item: str, channel: int) -> float:
+        name = item.upper()
+        if name == 'P':
+            return self._rig.voltage(channel) * self._rig.current(channel)
+        if name in ('PF', 'LAMBDA'):
+            return min(1.0, 0.99 + random.gauss(0, 0.005))
+        if name.startswith('F'):
+            return 50.0 + random.gauss(0, 0.01)
+        if name.startswith('U'):
+            return self._rig.voltage(channel)
+        if name.startswith('I'):
+            return self._rig.current(channel)
+        return float('nan')
+
+    async def _wait_for_update(self) -> None:
+        period = 1 / self._config.power_analyzer_update_rate
+        now = time.monotonic()
+        update = max(int((now - self._started) / period) + 1, self._update + 1)
+        await asyncio.sleep(self._started + update * period - now)
+        self._update = update
+
+    async def _respond(self, line: str, writer: asyncio.StreamWriter) -> str | bytes | None:
+        if line.startswith(':MEAS?'):
+            parts = []
+            for query in line.split(';'):
+                items = query.strip().removeprefix(':MEAS?').strip().split(',')
+                values = [self._value(*self._split(item)) for item in items]
+                parts.append(','.join(f'{value:.4E}' for value in values))
+            return ';'.join(parts)
+        if line.startswith(':NUM:FORM'):
+            self._binary = line.split()[-1].upper().startswith('FLO')
+        elif match := re.fullmatch(r':NUM:NORM:NUM (\d+)', line):
+            self._count = int(match[1])
+        elif match := re.fullmatch(r':NUM:NORM:ITEM(\d+) (\w+),(\d+)', line):
+            self._items[int(match[1])] = (match[2], int(match[3]))
+        elif line == ':NUM:NORM:VAL?':
+            values = [self._value(*self._items[number]) if number in self._items else float('nan')
+                      for number in range(1, self._count + 1)]
+            if not self._binary:
+                return ','.join(f'{value:.5E}' for value in values)
+            payload = struct.pack(f'>{len(values)}f', *values)
+            return f'#4{len(payload):04d}'.encode('UTF-8') + payload
+        elif line == ':COMM:WAIT 1':
+            await self._wait_for_update()
+        elif line == ':STAT:EESR?':
+            return '1'
+        elif not line.startswith(':STAT:'):
+            return await super()._respond(line, writer)
+        return None
+
+    @staticmethod
+    def _split(item: str) -> tuple[str, int]:
+        match = re.fullmatch(r'([A-Za-z]+)(\d+)', item.strip())
+        if match is None:
+            raise ValueError(f'Unknown item: {item}')
+        return match[1], int(match[2])
+
+
+class ArduinoSimulator(SimulatedInstrument):
+    def __init__(self, rig: Rig, config: SimulationConfig):
+        super().__init__(rig, config)
+        self._streams = {}
+
+    async def _respond(self, line: str, writer: asyncio.StreamWriter) -> str | None:
+        if line == 'subscribe':
+            if writer not in self._streams:
+                self._streams[writer] = asyncio.create_task(self._stream(writer))
+        elif line == 'unsubscribe':
+            task = self._streams.pop(writer, None)
+            if task is not None:
+                task.cancel()
+        return None
+
+    def _adc(self, channel: int) -> int:
+        voltage = self._rig.sensor_m + self._rig.sensor_k * self._rig.current(channel)
+        return max(0, min(1023, round(voltage / 3.3 * 1023)))
+
+    async def _stream(self, writer: asyncio.StreamWriter) -> None:
+        start = time.monotonic()
+        sent = 0
+        try:
+            while True:
+                await asyncio.sleep(0.005)
+                due = int((time.monotonic() - start) * self._config.arduino_sample_rate) - sent
+                if due <= 0:
+                    continue
+                await self._delay()
+                lines = []
+                for _ in range(due):
+                    lines.append('#garbage' if self._fault() else f'{self._adc(1)},{self._adc(2)}')
+                writer.write(('\n'.join(lines) + '\n').encode('UTF-8'))
+                await writer.drain()
+                sent += due
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+
+class Simulation:
+    def __init__(self, config: SimulationConfig, power_supplies: int, power_analyzers: int = 1, arduinos: int = 1):
+        self._config = config
+        self._rig = Rig(power_supplies, config.sensor_k, config.sensor_m, config.noise)
+        ports = iter(range(config.base_port, config.base_port + power_supplies + power_analyzers + arduinos))
+        self._instruments = [('power_supply', next(ports), PowerSupplySimulator(self._rig, config, i))
+                             for i in range(power_supplies)]
+        self._instruments += [('power_analyzer', next(ports), PowerAnalyzerSimulator(self._rig, config))
+                              for _ in range(power_analyzers)]
+        self._instruments += [('arduino', next(ports), ArduinoSimulator(self._rig, config))
+                              for _ in range(arduinos)]
+        self._loop = None
+        self._servers = []
+
+    async def serve(self) -> None:
+        for _, port, instrument in self._instruments:
+            self._servers.append(await asyncio.start_server(instrument.handle, self._config.host, port))
+
+    def start(self) -> dict[str, list[tuple[str, int]]]:
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return self.addresses
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            for server in self._servers:
+                self._loop.call_soon_threadsafe(server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    @property
+    def addresses(self) -> dict[str, list[tuple[str, int]]]:
+        addresses = {}
+        for kind, port, _ in self._instruments:
+            addresses.setdefault(kind, []).append((self._config.host, port))
+        return addresses
+
+
+async def main() -> None:
+    config_path = Path(__file__).parent.parent / 'config/config.yaml'
+    simulation = Simulation(SimulationConfig.from_yaml(config_path), len(PowerSupplyConfig.from_yaml(config_path).ip),
+                            len(PowerAnalyzerConfig.from_yaml(config_path).ip), len(ArduinoConfig.from_yaml(config_path).ip))
+    await simulation.serve()
+    for kind, addresses in simulation.addresses.items():
+        print(f'{kind}: {", ".join(f"{host}:{port}" for host, port in addresses)}')
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
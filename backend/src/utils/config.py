@@ -3,6 +3,16 @@ from pathlib import Path
 from dataclasses import dataclass
 
 
+def _instances(section: dict, default: str) -> tuple[list[str], list[str]]:
+    ips = section['ip'] if isinstance(section['ip'], list) else [section['ip']]
+    ids = section.get('ids')
+    if ids is None:
+        ids = [default] if len(ips) == 1 else [f'{default}{i}' for i in range(1, len(ips) + 1)]
+    if len(ids) != len(ips) or len(set(ids)) != len(ids):
+        raise ValueError(f'Expected {len(ips)} unique ids for {default}, got: {ids}')
+    return ips, ids
+
+
 @dataclass
 class APIConfig:
     sample_frequency: float
@@ -12,6 +22,9 @@ class APIConfig:
     calibration_current_step: int
     calibration_current_max: int
     samples: int
+    calibration_channels: dict[str, str]
+    calibration_field: str
+    profiling: bool
 
     @classmethod
     def from_yaml(cls, path: str | Path) -> 'APIConfig':
@@ -24,7 +37,10 @@ class APIConfig:
                 calibration_current_start=data['api']['calibration']['current_start'],
                 calibration_current_step=data['api']['calibration']['current_step'],
                 calibration_current_max=data['api']['calibration']['current_max'],
-                samples=data['api']['calibration']['samples']
+                samples=data['api']['calibration']['samples'],
+                calibration_channels=data['api']['calibration']['channels'],
+                calibration_field=data['api']['calibration'].get('field', 'current'),
+                profiling=data['api'].get('profiling', False)
             )
         except KeyError as e:
             raise ValueError(f'Missing expected key: {e}')
@@ -33,25 +49,30 @@ class APIConfig:
 @dataclass
 class PowerSupplyConfig:
     ip: list[str]
+    ids: list[str]
     port: int
     buffer_size: int
     timeout: float
     max_voltage: float
     max_current: float
     max_power: float
+    cache_ttl: float
 
     @classmethod
     def from_yaml(cls, path: str | Path) -> 'PowerSupplyConfig':
         data = yaml.safe_load(open(path))
         try:
+            ips, ids = _instances(data['power_supply'], 'psu')
             return cls(
-                ip=data['power_supply']['ip'],
+                ip=ips,
+                ids=ids,
                 port=data['power_supply']['port'],
                 buffer_size=data['power_supply']['buffer_size'],
                 timeout=data['power_supply']['timeout'],
                 max_voltage=data['power_supply']['limits']['max_voltage'],
                 max_current=data['power_supply']['limits']['max_current'],
-                max_power=data['power_supply']['limits']['max_power']
+                max_power=data['power_supply']['limits']['max_power'],
+                cache_ttl=data['power_supply']['cache_ttl']
             )
         except KeyError as e:
             raise ValueError(f'Missing expected key: {e}')
@@ -59,22 +80,35 @@ class PowerSupplyConfig:
 
 @dataclass
 class PowerAnalyzerConfig:
-    ip: str
+    ip: list[str]
+    ids: list[str]
     port: int
     buffer_size: int
     timeout: float
     sampling_frequency: float
+    history_size: int
+    channels: list[int]
+    quantities: dict[str, str]
+    mode: str
+    sync: bool
 
     @classmethod
     def from_yaml(cls, path: str | Path) -> 'PowerAnalyzerConfig':
         data = yaml.safe_load(open(path))
         try:
+            ips, ids = _instances(data['power_analyzer'], 'pwa')
             return cls(
-                ip=data['power_analyzer']['ip'],
+                ip=ips,
+                ids=ids,
                 port=data['power_analyzer']['port'],
                 buffer_size=data['power_analyzer']['buffer_size'],
                 timeout=data['power_analyzer']['timeout'],
-                sampling_frequency=data['power_analyzer']['sampling_frequency']
+                sampling_frequency=data['power_analyzer']['sampling_frequency'],
+                history_size=data['power_analyzer']['history_size'],
+                channels=data['power_analyzer']['channels'],
+                quantities=data['power_analyzer']['quantities'],
+                mode=data['power_analyzer']['mode'],
+                sync=data['power_analyzer']['sync']
             )
         except KeyError as e:
             raise ValueError(f'Missing expected key: {e}')
@@ -103,22 +137,179 @@ class OscilloscopeConfig:
 
 @dataclass
 class ArduinoConfig:
-    ip: str
+    ip: list[str]
+    ids: list[str]
     port: int
     buffer_size: int
     timeout: float
     sampling_frequency: float
+    history_size: int
+    filters: list[dict]
 
     @classmethod
     def from_yaml(cls, path: str | Path) -> 'ArduinoConfig':
         data = yaml.safe_load(open(path))
         try:
+            ips, ids = _instances(data['arduino'], 'arduino')
             return cls(
-                ip=data['arduino']['ip'],
+                ip=ips,
+                ids=ids,
                 port=data['arduino']['port'],
                 buffer_size=data['arduino']['buffer_size'],
                 timeout=data['arduino']['timeout'],
-                sampling_frequency=data['arduino']['sampling_frequency']
+                sampling_frequency=data['arduino']['sampling_frequency'],
+                history_size=data['arduino']['history_size'],
+                filters=data['arduino'].get('filters') or []
+            )
+        except KeyError as e:
+            raise ValueError(f'Missing expected key: {e}')
+
+
+@dataclass
+class RecorderConfig:
+    max_chunk_size: int
+    max_chunk_duration: float
+    flush_interval: float
+    queue_size: int
+
+    @classmethod
+    def from_yaml(cls, path: str | Path) -> 'RecorderConfig':
+        data = yaml.safe_load(open(path))
+        try:
+            return cls(
+                max_chunk_size=data['recorder']['max_chunk_size'],
+                max_chunk_duration=data['recorder']['max_chunk_duration'],
+                flush_interval=data['recorder']['flush_interval'],
+                queue_size=data['recorder']['queue_size']
+            )
+        except KeyError as e:
+            raise ValueError(f'Missing expected key: {e}')
+
+
+@dataclass
+class StatsConfig:
+    windows: list[float]
+    limits: dict[str, float]
+
+    @classmethod
+    def from_yaml(cls, path: str | Path) -> 'StatsConfig':
+        data = yaml.safe_load(open(path))
+        try:
+            return cls(
+                windows=data['stats']['windows'],
+                limits=data['stats'].get('limits') or {}
+            )
+        except KeyError as e:
+            raise ValueError(f'Missing expected key: {e}')
+
+
+@dataclass
+class CaptureConfig:
+    boost_rate: float
+    max_duration: float
+
+    @classmethod
+    def from_yaml(cls, path: str | Path) -> 'CaptureConfig':
+        data = yaml.safe_load(open(path))
+        try:
+            return cls(
+                boost_rate=data['capture']['boost_rate'],
+                max_duration=data['capture']['max_duration']
+            )
+        except KeyError as e:
+            raise ValueError(f'Missing expected key: {e}')
+
+
+@dataclass
+class TraceConfig:
+    mode: str
+    path: str | None
+    speed: float
+
+    @classmethod
+    def from_yaml(cls, path: str | Path) -> 'TraceConfig':
+        data = yaml.safe_load(open(path))
+        trace = data.get('trace') or {'mode': 'live'}
+        try:
+            if trace['mode'] not in ('live', 'record', 'replay'):
+                raise ValueError(f'Unknown trace mode: {trace["mode"]}')
+            if trace['mode'] == 'replay' and not trace.get('path'):
+                raise ValueError('Replay needs trace.path')
+            return cls(
+                mode=trace['mode'],
+                path=trace.get('path'),
+                speed=trace.get('speed', 1.0)
+            )
+        except KeyError as e:
+            raise ValueError(f'Missing expected key: {e}')
+
+
+@dataclass
+class DaemonConfig:
+    enabled: bool
+    host: str
+    port: int
+    authkey: str | None
+    authkey_file: str
+    shared_memory: str
+    slots: int
+    slot_size: int
+    connect_timeout: float
+    poll_interval: float
+
+    @classmethod
+    def from_yaml(cls, path: str | Path) -> 'DaemonConfig':
+        data = yaml.safe_load(open(path))
+        daemon = data.get('daemon') or {'enabled': False}
+        try:
+            return cls(
+                enabled=daemon['enabled'],
+                host=daemon.get('host', '127.0.0.1'),
+                port=daemon.get('port', 18500),
+                authkey=daemon.get('authkey'),
+                authkey_file=str(Path(path).parent.parent / daemon.get('authkey_file', 'config/daemon.key')),
+                shared_memory=daemon.get('shared_memory', 'vp754a_snapshots'),
+                slots=daemon.get('slots', 8),
+                slot_size=daemon.get('slot_size', 65536),
+                connect_timeout=daemon.get('connect_timeout', 10.0),
+                poll_interval=daemon.get('poll_interval', 0.002)
+            )
+        except KeyError as e:
+            raise ValueError(f'Missing expected key: {e}')
+
+
+@dataclass
+class SimulationConfig:
+    enabled: bool
+    host: str
+    base_port: int
+    latency: float
+    jitter: float
+    fault_rate: float
+    drop_rate: float
+    arduino_sample_rate: float
+    power_analyzer_update_rate: float
+    sensor_k: float
+    sensor_m: float
+    noise: float
+
+    @classmethod
+    def from_yaml(cls, path: str | Path) -> 'SimulationConfig':
+        data = yaml.safe_load(open(path))
+        try:
+            return cls(
+                enabled=data['simulation']['enabled'],
+                host=data['simulation']['host'],
+                base_port=data['simulation']['base_port'],
+                latency=data['simulation']['latency'],
+                jitter=data['simulation']['jitter'],
+                fault_rate=data['simulation']['fault_rate'],
+                drop_rate=data['simulation']['drop_rate'],
+                arduino_sample_rate=data['simulation']['arduino_sample_rate'],
+                power_analyzer_update_rate=data['simulation']['power_analyzer_update_rate'],
+                sensor_k=data['simulation']['sensor_k'],
+                sensor_m=data['simulation']['sensor_m'],
+                noise=data['simulation']['noise']
             )
         except KeyError as e:
             raise ValueError(f'Missing expected key: {e}')
@@ -0,0 +1,87 @@
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class MovingAverage:
+    def __init__(self, size: int):
+        self._size = size
+        self._tail = None
+
+    def __call__(self, times: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if self._tail is None:
+            self._tail = np.repeat(values[:1], self._size - 1, axis=0)
+        extended = np.concatenate((self._tail, values))
+        sums = np.concatenate((np.zeros((1, values.shape[1])), np.cumsum(extended, axis=0)))
+        self._tail = extended[len(extended) - self._size + 1:]
+        return times, (sums[self._size:] - sums[:-self._size]) / self._size
+
+
+class Median:
+    def __init__(self, size: int):
+        self._size = size
+        self._tail = None
+
+    def __call__(self, times: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if self._tail is None:
+            self._tail = np.repeat(values[:1], self._size - 1, axis=0)
+        extended = np.concatenate((self._tail, values))
+        self._tail = extended[len(extended) - self._size + 1:]
+        return times, np.median(sliding_window_view(extended, self._size, axis=0), axis=-1)
+
+
+class EMA:
+    def __init__(self, alpha: float):
+        self._alpha = alpha
+        self._decay = 1 - alpha
+        self._chunk = 4096 if self._decay >= 1 or self._decay <= 0 else max(
+            1, min(4096, int(150 / -math.log10(self._decay))))
+        self._state = None
+
+    def __call__(self, times: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if self._decay <= 0:
+            return times, values
+        if self._state is None:
+            self._state = values[0].astype(np.float64)
+        output = np.empty(values.shape, dtype=np.float64)
+        for start in range(0, len(values), self._chunk):
+            chunk = values[start:start + self._chunk]
+            powers = self._decay ** np.arange(1, len(chunk) + 1)[:, None]
+            output[start:start + len(chunk)] = powers * (self._state + self._alpha * np.cumsum(chunk / powers, axis=0))
+            self._state = output[start + len(chunk) - 1]
+        return times, output
+
+
+class Decimate:
+    def __init__(self, factor: int):
+        self._factor = factor
+        self._phase = 0
+
+    def __call__(self, times: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        start = -self._phase % self._factor
+        self._phase = (self._phase + len(values)) % self._factor
+        return times[start::self._factor], values[start::self._factor]
+
+
+STAGES = {'moving_average': lambda spec: MovingAverage(int(spec['size'])),
+          'median': lambda spec: Median(int(spec['size'])),
+          'ema': lambda spec: EMA(float(spec['alpha'])),
+          'decimate': lambda spec: Decimate(int(spec['factor']))}
+
+
+class FilterChain:
+    def __init__(self, stages: list[dict]):
+        try:
+            self._stages = [STAGES[stage['type']](stage) for stage in stages]
+        except KeyError as e:
+            raise ValueError(f'Invalid filter stage: {e}')
+
+    def __call__(self, times: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        for stage in self._stages:
+            if len(values) == 0:
+                break
+            times, values = stage(times, values)
+        return times, values
+
+    def __bool__(self) -> bool:
+        return bool(self._stages)
@@ -0,0 +1,111 @@
+import threading
+import time
+import uuid
+from typing import Any, Callable
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, target: Callable[['Job'], Any]):
+        self._id = uuid.uuid4().hex[:12]
+        self._kind = kind
+        self._target = target
+        self._state = 'pending'
+        self._progress = {}
+        self._events = []
+        self._result = None
+        self._error = None
+        self._started = 0.0
+        self._finished = 0.0
+        self._version = 0
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        try:
+            result = self._target(self)
+            state = 'done'
+        except JobCancelled:
+            result = None
+            state = 'cancelled'
+        except Exception as e:
+            print('Error: ', e)
+            result = None
+            state = 'failed'
+            self._error = str(e)
+        with self._lock:
+            self._result = result
+            self._state = state
+            self._finished = time.time()
+            self._version += 1
+        self._done.set()
+
+    def start(self) -> 'Job':
+        self._started = time.time()
+        self._state = 'running'
+        self._thread.start()
+        return self
+
+    def update(self, **progress) -> None:
+        with self._lock:
+            self._progress.update(progress)
+            self._version += 1
+
+    def emit(self, event: Any) -> None:
+        with self._lock:
+            self._events.append(event)
+            self._version += 1
+
+    def events(self, since: int = 0) -> list[Any]:
+        with self._lock:
+            return self._events[since:]
+
+    def check(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def sleep(self, seconds: float) -> None:
+        if self._cancel.wait(seconds):
+            raise JobCancelled()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def running(self) -> bool:
+        return not self._done.is_set()
+
+    @property
+    def finished(self) -> float:
+        return self._finished
+
+    @property
+    def result(self) -> Any:
+        return self._result
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            end = self._finished if self._finished else time.time()
+            return {'id': self._id, 'kind': self._kind, 'state': self._state, 'progress': dict(self._progress),
+                    'result': self._result, 'error': self._error, 'elapsed': end - self._started}
@@ -0,0 +1,191 @@
+import bisect
+import math
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = '') -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def samples(self, name: str, names: tuple[str, ...], values: tuple[str, ...]) -> list[str]:
+        return [f'{name}{_format_labels(names, values)} {_format_value(self._value)}']
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Gauge:
+    def __init__(self):
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def samples(self, name: str, names: tuple[str, ...], values: tuple[str, ...]) -> list[str]:
+        return [f'{name}{_format_labels(names, values)} {_format_value(self._value)}']
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def samples(self, name: str, names: tuple[str, ...], values: tuple[str, ...]) -> list[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._buckets + (math.inf,), counts):
+            cumulative += count
+            bucket = 'le="' + _format_value(bound) + '"'
+            lines.append(f'{name}_bucket{_format_labels(names, values, bucket)} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(names, values)} {_format_value(total)}')
+        lines.append(f'{name}_count{_format_labels(names, values)} {cumulative}')
+        return lines
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+
+class RateMeter:
+    def __init__(self, gauge: Gauge, window: float = 1.0):
+        self._gauge = gauge
+        self._window = window
+        self._count = 0
+        self._start = time.monotonic()
+
+    def tick(self, count: int = 1) -> None:
+        self._count += count
+        now = time.monotonic()
+        if now - self._start >= self._window:
+            self._gauge.set(self._count / (now - self._start))
+            self._count = 0
+            self._start = now
+
+
+class MetricFamily:
+    def __init__(self, name: str, help_text: str, kind: str, label_names: tuple[str, ...], factory):
+        self._name = name
+        self._help = help_text
+        self._kind = kind
+        self._label_names = label_names
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    def remove(self, *values: str) -> None:
+        with self._lock:
+            self._children.pop(tuple(str(value) for value in values), None)
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self._name} {self._help}', f'# TYPE {self._name} {self._kind}']
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            lines.extend(child.samples(self._name, self._label_names, values))
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name: str, help_text: str, kind: str, labels: tuple[str, ...], factory) -> MetricFamily:
+        with self._lock:
+            if name not in self._families:
+                self._families[name] = MetricFamily(name, help_text, kind, labels, factory)
+            return self._families[name]
+
+    def counter(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> MetricFamily:
+        return self._family(name, help_text, 'counter', labels, Counter)
+
+    def gauge(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> MetricFamily:
+        return self._family(name, help_text, 'gauge', labels, Gauge)
+
+    def histogram(self, name: str, help_text: str, labels: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> MetricFamily:
+        return self._family(name, help_text, 'histogram', labels, lambda: Histogram(buckets))
+
+    def render(self, include: tuple[str, ...] | None = None, exclude: tuple[str, ...] = ()) -> str:
+        with self._lock:
+            families = [family for name, family in self._families.items()
+                        if (include is None or name in include) and name not in exclude]
+        lines = []
+        for family in families:
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = MetricsRegistry()
+COMMAND_LATENCY = METRICS.histogram('instrument_command_seconds', 'Round-trip time of instrument queries.',
+                                    ('instrument', 'command'))
+INSTRUMENT_ERRORS = METRICS.counter('instrument_errors_total', 'Instrument I/O and parse errors.',
+                                    ('instrument', 'kind'))
+INSTRUMENT_UP = METRICS.gauge('instrument_connected', 'Whether the instrument link is up.', ('instrument',))
+SAMPLES = METRICS.counter('acquisition_samples_total', 'Samples acquired.', ('instrument',))
+SAMPLE_RATE = METRICS.gauge('acquisition_rate_hz', 'Achieved acquisition rate over the last second.',
+                            ('instrument',))
+TARGET_RATE = METRICS.gauge('acquisition_target_rate_hz', 'Configured acquisition rate of polled instruments.',
+                            ('instrument',))
+SNAPSHOT_JITTER = METRICS.histogram('snapshot_loop_jitter_seconds',
+                                    'Absolute difference between actual and configured snapshot loop period.')
+SKIPPED_TICKS = METRICS.counter('scheduler_skipped_ticks_total', 'Ticks skipped because a loop overran its deadline.',
+                                ('loop',))
+WEBSOCKET_SEND = METRICS.histogram('websocket_send_seconds', 'Time spent sending one frame to a client.',
+                                   ('client',))
+WEBSOCKET_DROPPED = METRICS.counter('websocket_dropped_frames_total', 'Frames dropped for slow clients.',
+                                    ('client',))
+GLITCHES = METRICS.counter('glitch_samples_total', 'Samples left out of the statistics for exceeding a limit.',
+                           ('instrument',))
+HTTP_REQUESTS = METRICS.histogram('http_request_seconds', 'HTTP request handling time.', ('method', 'route'))
+API_METRICS = ('websocket_send_seconds', 'websocket_dropped_frames_total', 'http_request_seconds')
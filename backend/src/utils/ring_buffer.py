@@ -0,0 +1,59 @@
+import threading
+import numpy as np
+
+
+class RingBuffer:
+    def __init__(self, capacity: int, fields: tuple[str, ...]):
+        self._capacity = capacity
+        self._fields = fields
+        self._time = np.zeros(capacity, dtype=np.float64)
+        self._values = np.full((capacity, len(fields)), np.nan, dtype=np.float64)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp: float, values: tuple[float, ...]) -> None:
+        with self._lock:
+            index = self._count % self._capacity
+            self._time[index] = timestamp
+            self._values[index] = values
+            self._count += 1
+
+    def extend(self, times: np.ndarray, values: np.ndarray) -> None:
+        skipped = max(len(times) - self._capacity, 0)
+        times = times[skipped:]
+        values = values[skipped:]
+        with self._lock:
+            indices = (self._count + skipped + np.arange(len(times))) % self._capacity
+            self._time[indices] = times
+            self._values[indices] = values
+            self._count += skipped + len(times)
+
+    def since(self, timestamp: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            head = self._count % self._capacity
+            if self._count <= self._capacity:
+                times = self._time[:self._count].copy()
+                values = self._values[:self._count].copy()
+            else:
+                times = np.concatenate((self._time[head:], self._time[:head]))
+                values = np.concatenate((self._values[head:], self._values[:head]))
+        if timestamp is not None:
+            start = np.searchsorted(times, timestamp, side='right')
+            times = times[start:]
+            values = values[start:]
+        return times, values
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return self._fields
+
+    @property
+    def total(self) -> int:
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return min(self._count, self._capacity)
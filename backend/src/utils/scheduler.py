@@ -0,0 +1,30 @@
+import threading
+import time
+from src.utils.metrics import SKIPPED_TICKS
+
+
+class Deadline:
+    def __init__(self, frequency: float, name: str):
+        self._period = 1 / frequency
+        self._next = time.monotonic()
+        self._skipped = SKIPPED_TICKS.labels(name)
+
+    def _advance(self) -> float:
+        now = time.monotonic()
+        self._next += self._period
+        if now > self._next:
+            missed = int((now - self._next) // self._period) + 1
+            self._next += missed * self._period
+            self._skipped.inc(missed)
+        return max(self._next - now, 0.0)
+
+    def wait(self, stop: threading.Event | None = None) -> bool:
+        delay = self._advance()
+        if stop is not None:
+            return not stop.wait(delay)
+        time.sleep(delay)
+        return True
+
+    @property
+    def period(self) -> float:
+        return self._period
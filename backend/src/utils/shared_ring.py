@@ -0,0 +1,69 @@
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+
+class SharedRing:
+    _header = struct.Struct('<QQQ')
+    _slot = struct.Struct('<QQQ')
+
+    def __init__(self, name: str, slots: int = 8, slot_size: int = 65536, create: bool = False):
+        if create:
+            size = self._header.size + slots * (self._slot.size + slot_size)
+            try:
+                self._memory = shared_memory.SharedMemory(name, create=True, size=size)
+            except FileExistsError:
+                stale = shared_memory.SharedMemory(name)
+                stale.close()
+                stale.unlink()
+                self._memory = shared_memory.SharedMemory(name, create=True, size=size)
+            self._header.pack_into(self._memory.buf, 0, slots, slot_size, 0)
+        else:
+            self._memory = shared_memory.SharedMemory(name)
+            resource_tracker.unregister(self._memory._name, 'shared_memory')
+            slots, slot_size, _ = self._header.unpack_from(self._memory.buf, 0)
+        self._slots = slots
+        self._slot_size = slot_size
+        self._owner = create
+
+    def _offset(self, index: int) -> int:
+        return self._header.size + index * (self._slot.size + self._slot_size)
+
+    def write(self, sequence: int, payload: bytes) -> None:
+        if len(payload) > self._slot_size:
+            raise ValueError(f'Record of {len(payload)} bytes exceeds slot size {self._slot_size}')
+        buffer = self._memory.buf
+        written = self._header.unpack_from(buffer, 0)[2]
+        offset = self._offset(written % self._slots)
+        lock = self._slot.unpack_from(buffer, offset)[0]
+        self._slot.pack_into(buffer, offset, lock + 1, sequence, len(payload))
+        start = offset + self._slot.size
+        buffer[start:start + len(payload)] = payload
+        self._slot.pack_into(buffer, offset, lock + 2, sequence, len(payload))
+        self._header.pack_into(buffer, 0, self._slots, self._slot_size, written + 1)
+
+    @property
+    def written(self) -> int:
+        return self._header.unpack_from(self._memory.buf, 0)[2]
+
+    def read(self, retries: int = 100) -> tuple[int, bytes] | None:
+        buffer = self._memory.buf
+        for _ in range(retries):
+            written = self._header.unpack_from(buffer, 0)[2]
+            if written == 0:
+                return None
+            offset = self._offset((written - 1) % self._slots)
+            lock, sequence, length = self._slot.unpack_from(buffer, offset)
+            if lock % 2:
+                time.sleep(0)
+                continue
+            start = offset + self._slot.size
+            payload = bytes(buffer[start:start + length])
+            if self._slot.unpack_from(buffer, offset)[0] == lock:
+                return sequence, payload
+        raise TimeoutError('Shared ring kept changing while being read')
+
+    def close(self) -> None:
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
@@ -1,17 +1,106 @@
 import numpy as np
-from typing import Any, Tuple
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
+from dataclasses import dataclass, asdict
 
 
-def regression(x: list[list[float]], y: list[list[float]]) -> Tuple[float, float]:
-    x_train, x_test, y_train, y_test = train_test_split(np.array(flatten(x)).reshape(-1, 1),
-                                                        np.array(flatten(y)).reshape(-1, 1),
-                                                        train_size=0.8, shuffle=True)
-    model = LinearRegression()
-    model.fit(x_train, y_train)
-    return model.coef_[0][0], model.intercept_[0]
+@dataclass
+class LineFit:
+    k: float
+    m: float
+    rmse: float
+    max_residual: float
+    r2: float | None
+    samples: int
+    rejected: int
 
+    def to_dict(self) -> dict[str, float | int | None]:
+        return asdict(self)
 
-def flatten(xss: list[list[Any]]) -> list[Any]:
-    return [x for xs in xss for x in xs]
+
+def robust_mask(values: np.ndarray, threshold: float = 3.5) -> np.ndarray:
+    finite = np.isfinite(values)
+    if not finite.any():
+        return finite
+    median = np.median(values[finite])
+    deviation = np.abs(values - median)
+    scale = 1.4826 * np.median(deviation[finite])
+    if scale == 0:
+        return finite & (deviation == 0)
+    return finite & (deviation <= threshold * scale)
+
+
+def regression(x: np.ndarray, y: np.ndarray, threshold: float = 3.5, iterations: int = 5) -> LineFit:
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    mask = robust_mask(x, 2 * threshold) & np.isfinite(y)
+    if mask.sum() < 2:
+        raise ValueError('At least two finite samples are required for a line fit')
+    if np.ptp(x[mask]) == 0:
+        raise ValueError('x has no spread, the slope of the line fit is undefined')
+    for _ in range(iterations):
+        design = np.column_stack((x[mask], np.ones(mask.sum())))
+        (k, m), *_ = np.linalg.lstsq(design, y[mask], rcond=None)
+        keep = mask & robust_mask(y - (k * x + m), threshold)
+        if keep.sum() < 2 or np.array_equal(keep, mask):
+            break
+        mask = keep
+    residuals = y[mask] - (k * x[mask] + m)
+    total = np.sum((y[mask] - y[mask].mean()) ** 2)
+    spread = np.sqrt(np.sum((x[mask] - x[mask].mean()) ** 2))
+    deviation = np.sqrt(np.sum(residuals ** 2) / max(mask.sum() - 2, 1))
+    if abs(k) * spread <= 2 * deviation or abs(k) * np.ptp(x[mask]) <= 1e-9 * np.max(np.abs(y[mask])):
+        raise ValueError(f'The slope of the line fit ({k:.3g}) is not distinguishable from zero')
+    return LineFit(k=float(k), m=float(m), rmse=float(np.sqrt(np.mean(residuals ** 2))),
+                   max_residual=float(np.max(np.abs(residuals))),
+                   r2=float(1 - np.sum(residuals ** 2) / total) if total > 0 else None,
+                   samples=int(mask.sum()), rejected=int(len(x) - mask.sum()))
+
+
+def align(times: np.ndarray, source_times: np.ndarray, source_values: np.ndarray,
+          max_gap: float | None = None) -> np.ndarray:
+    aligned = np.full(len(times), np.nan)
+    if len(source_times) == 0:
+        return aligned
+    inside = (times >= source_times[0]) & (times <= source_times[-1])
+    aligned[inside] = np.interp(times[inside], source_times, source_values)
+    if max_gap is not None and len(source_times) > 1:
+        right = np.clip(np.searchsorted(source_times, times), 1, len(source_times) - 1)
+        gap = source_times[right] - source_times[right - 1]
+        aligned[gap > max_gap] = np.nan
+    return aligned
+
+
+def min_max(y: np.ndarray, max_points: int) -> np.ndarray:
+    size = len(y)
+    buckets = max_points // 2
+    if size <= max_points or buckets < 1:
+        return np.arange(size)
+    edges = np.linspace(0, size, buckets + 1).astype(np.int64)
+    indices = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = np.nan_to_num(y[start:end], nan=0.0)
+        low = start + int(np.argmin(bucket))
+        high = start + int(np.argmax(bucket))
+        indices.extend(sorted((low, high)) if low != high else (low,))
+    return np.array(indices, dtype=np.int64)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    size = len(x)
+    if size <= max_points or max_points < 3:
+        return np.arange(size)
+    y = np.nan_to_num(y, nan=0.0)
+    edges = np.linspace(1, size - 1, max_points - 1).astype(np.int64)
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = size - 1
+    selected = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else size
+        mean_x = x[end:next_end].mean()
+        mean_y = y[end:next_end].mean()
+        area = np.abs((x[selected] - mean_x) * (y[start:end] - y[selected])
+                      - (x[selected] - x[start:end]) * (mean_y - y[selected]))
+        selected = start + int(np.argmax(area))
+        indices[i + 1] = selected
+    return indices
@@ -1,5 +1,13 @@
-import {apiPost} from './client.js';
+import {apiGet, apiPost} from './client.js';
 
 export function getCalibration(saveFile) {
     return apiPost('api/calibrate', {saveFile});
 }
+
+export function getCalibrationStatus(jobId) {
+    return apiGet(`api/calibrate/${jobId}`);
+}
+
+export function cancelCalibration(jobId) {
+    return apiPost(`api/calibrate/${jobId}/cancel`);
+}
@@ -5,7 +5,7 @@ export const API_BASE = `http://${config.ip}:8000`
 
 
 export async function apiGet(path) {
-    const response = await fetch(`${config.api_base}/${path}`)
+    const response = await fetch(`${API_BASE}/${path}`)
     if (!response.ok) throw new Error(`${response.status} ${response.statusText}`)
     return response.json()
 }
@@ -1,5 +1,19 @@
-import {apiGet} from './client.js';
+import {API_BASE, apiGet} from './client.js';
 
 export function getData() {
     return apiGet('api/data')
 }
+
+export async function waitForData(after, timeout = 10) {
+    const response = await fetch(`${API_BASE}/api/data?after=${after}&timeout=${timeout}`)
+    if (response.status === 304) return null
+    if (!response.ok) throw new Error(`${response.status} ${response.statusText}`)
+    return response.json()
+}
+
+export function getHistory(channel, since = null, maxPoints = 400, field = null) {
+    const params = new URLSearchParams({channel, max_points: maxPoints})
+    if (since != null) params.set('since', since)
+    if (field != null) params.set('field', field)
+    return apiGet(`api/history?${params}`)
+}
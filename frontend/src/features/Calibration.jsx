@@ -1,4 +1,4 @@
-import {getCalibration} from '../api/calibrateApi.js';
+import {cancelCalibration, getCalibration, getCalibrationStatus} from '../api/calibrateApi.js';
 import {useState} from 'react';
 import '../styles/Calibration.css';
 
@@ -7,19 +7,40 @@ export default function Calibrate() {
     const [saveFile, setSaveFile] = useState(false);
     const [msg, setMsg] = useState('');
     const [error, setError] = useState(null);
+    const [jobId, setJobId] = useState(null);
 
     async function onCalibrate() {
         if (busy) return;
         setBusy(true);
         setMsg('');
         try {
-            await getCalibration(saveFile);
-            setMsg('Triggered!');
+            let job = await getCalibration(saveFile);
+            setJobId(job.id);
             setError(null)
+            while (job.state === 'running') {
+                const {step, steps, samples, eta} = job.progress;
+                if (step) setMsg(`Step ${step}/${steps}, ${samples} samples, ETA ${Math.round(eta ?? 0)} s`);
+                await new Promise(resolve => setTimeout(resolve, 500));
+                job = await getCalibrationStatus(job.id);
+            }
+            setMsg(job.state === 'done' ? 'Done!' : job.state);
+            const skipped = Object.values(job.result ?? {}).filter((fit) => fit.error).map((fit) => fit.error);
+            if (job.error) setError(new Error(job.error));
+            else if (skipped.length) setError(new Error(skipped.join('; ')));
         } catch (e) {
             setError(e);
         } finally {
             setBusy(false);
+            setJobId(null);
+        }
+    }
+
+    async function onCancel() {
+        if (jobId == null) return;
+        try {
+            await cancelCalibration(jobId);
+        } catch (e) {
+            setError(e);
         }
     }
 
@@ -31,6 +52,7 @@ export default function Calibrate() {
                     <button onClick={onCalibrate} disabled={busy}>
                         {busy ? "Calibrating…" : "Calibrate"}
                     </button>
+                    {busy && <button onClick={onCancel}>Cancel</button>}
                     <label className="save-to-file">
                         Save measurement:
                         <input
@@ -41,6 +63,7 @@ export default function Calibrate() {
                     </label>
                 </div>
             </div>
+            {msg && <div className="message">{msg}</div>}
             <div className="error">
                 {error && (<div className="error-text">
                     {error?.message ?? String(error)}
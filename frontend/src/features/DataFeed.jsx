@@ -17,11 +17,12 @@ export default function DataFeed() {
                     yMin={0}
                     yMax={100}
                     maxPoints={400}
+                    field="current"
                     series={[
-                        {id: "c1", label: "Ch1", value: values.pwa.channel1.current, color: "#3b82f6"},
-                        {id: "c2", label: "Ch2", value: values.pwa.channel2.current, color: "#ef4444"},
-                        {id: "c3", label: "Ch3", value: values.pwa.channel3.current, color: "#22c55e"},
-                        {id: "c4", label: "Ch4", value: values.pwa.channel4.current, color: "#a855f7"},
+                        {id: "c1", label: "Ch1", channel: "pwa.channel1", value: values.pwa.channel1.current, color: "#3b82f6"},
+                        {id: "c2", label: "Ch2", channel: "pwa.channel2", value: values.pwa.channel2.current, color: "#ef4444"},
+                        {id: "c3", label: "Ch3", channel: "pwa.channel3", value: values.pwa.channel3.current, color: "#22c55e"},
+                        {id: "c4", label: "Ch4", channel: "pwa.channel4", value: values.pwa.channel4.current, color: "#a855f7"},
                     ]}
                 />
             </div>
@@ -35,17 +36,18 @@ export default function DataFeed() {
                     yMin={2}
                     yMax={3}
                     maxPoints={400}
+                    field="voltage"
                     series={[
-                        {id: "c1", label: "Ch1", value: values.arduino.channels.channel1.voltage, color: "#3b82f6"},
-                        {id: "c2", label: "Ch2", value: values.arduino.channels.channel2.voltage, color: "#ef4444"},]}
+                        {id: "c1", label: "Ch1", channel: "arduino.channel1", value: values.arduino.channels.channel1.voltage, color: "#3b82f6"},
+                        {id: "c2", label: "Ch2", channel: "arduino.channel2", value: values.arduino.channels.channel2.voltage, color: "#ef4444"},]}
                 />
             </div>
         </div>
         <div className="calibration-line">
             <LinearPlot
                 title="Linear regression"
-                k={values.arduino.calibration.k}
-                m={values.arduino.calibration.m}
+                k={values.arduino.calibration.channel1.k}
+                m={values.arduino.calibration.channel1.m}
                 xMin={0}
                 xMax={100}
                 yMin={2.25}
@@ -1,12 +1,38 @@
 import {useEffect, useMemo, useState} from 'react';
 import '../styles/DataFeed.css';
 import '../styles/Plots.css'
+import {getHistory} from '../api/dataStreamApi.js';
 
 
 export function MultiLinePlot({
-                                  title = "Multi Line plot", series, yMin, yMax, maxPoints = 400, height = 160,
+                                  title = "Multi Line plot", series, yMin, yMax, maxPoints = 400, height = 160, field,
                               }) {
     const [samples, setSamples] = useState([]);
+    const historyKey = series.map((s) => `${s.id}=${s.channel ?? ''}`).join("|");
+    useEffect(() => {
+        const sources = series.filter((s) => s.channel);
+        if (!field || sources.length === 0) return;
+        let active = true;
+        Promise.all(sources.map((s) => getHistory(s.channel, null, maxPoints, field)))
+            .then((histories) => {
+                if (!active) return;
+                const length = Math.max(...histories.map((h) => h.time.length));
+                const rows = [];
+                for (let i = 0; i < length; i++) {
+                    const row = {};
+                    sources.forEach((s, j) => {
+                        const n = histories[j][field][i];
+                        row[s.id] = Number.isFinite(n) ? n : null;
+                    });
+                    rows.push(row);
+                }
+                setSamples(rows);
+            })
+            .catch((e) => console.error('Error: ', e));
+        return () => {
+            active = false;
+        };
+    }, [historyKey, field, maxPoints]);
     const sampleKey = useMemo(() => {
         return series
             .map((s) => {
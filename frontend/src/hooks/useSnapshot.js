@@ -1,6 +1,6 @@
-import {useCallback, useState} from "react";
-import {useInterval} from "./useInterval.js";
-import {getData} from "../api/dataStreamApi.js";
+import {useCallback, useEffect, useState} from "react";
+import {getData, waitForData} from "../api/dataStreamApi.js";
+import {API_BASE} from "../api/client.js";
 
 const INITIAL = {
     time: '',
@@ -15,32 +15,78 @@ const INITIAL = {
             channel1: {voltage: '0.0', current: ''},
             channel2: {voltage: '0.0', current: ''}
         },
-        calibration: {k: '', m: ''},
+        calibration: {channel1: {k: '', m: ''}, channel2: {k: '', m: ''}},
     },
     error: null,
 };
 
 export function useDataSnapshot(pollMs = 50) {
     const [values, setValues] = useState(INITIAL);
+    const [socketOpen, setSocketOpen] = useState(false);
+
+    const apply = useCallback((data) => {
+        setValues(prev => ({
+            ...prev,
+            time: {...prev.time, ...data.time},
+            pwa: {...prev.pwa, ...data.pwa},
+            arduino: {...prev.arduino, ...data.arduino},
+            error: null,
+        }));
+    }, []);
 
     const refresh = useCallback(async () => {
         try {
-            const data = await getData();
-            if (data?.pwa && Object.values(data.pwa).some(ch => Number(ch?.current) > 1000)) return;
-
-            setValues(prev => ({
-                ...prev,
-                time: {...prev.time, ...data.time},
-                pwa: {...prev.pwa, ...data.pwa},
-                arduino: {...prev.arduino, ...data.arduino},
-                error: null,
-            }));
+            apply(await getData());
         } catch (e) {
             setValues(prev => ({...prev, error: e}));
         }
-    }, []);
+    }, [apply]);
+
+    useEffect(() => {
+        let socket;
+        let retry;
+        let closed = false;
+        const connect = () => {
+            socket = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/websocket/snapshot?rate=${1000 / pollMs}`);
+            socket.onopen = () => setSocketOpen(true);
+            socket.onmessage = (event) => apply(JSON.parse(event.data));
+            socket.onclose = () => {
+                setSocketOpen(false);
+                if (!closed) retry = setTimeout(connect, 2000);
+            };
+        };
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(retry);
+            socket.close();
+        };
+    }, [apply, pollMs]);
 
-    useInterval(refresh, pollMs);
+    useEffect(() => {
+        if (socketOpen) return;
+        let active = true;
+        const poll = async () => {
+            let sequence = 0;
+            while (active) {
+                try {
+                    const data = await waitForData(sequence);
+                    if (data && active) {
+                        sequence = data.sequence;
+                        apply(data);
+                        await new Promise(resolve => setTimeout(resolve, pollMs));
+                    }
+                } catch (e) {
+                    if (active) setValues(prev => ({...prev, error: e}));
+                    await new Promise(resolve => setTimeout(resolve, pollMs));
+                }
+            }
+        };
+        poll();
+        return () => {
+            active = false;
+        };
+    }, [apply, pollMs, socketOpen]);
 
     return {values, refresh, setValues};
 }